@@ -0,0 +1,154 @@
+import json
+import logging
+import random
+import time
+from collections import Counter
+from contextlib import ExitStack
+from contextvars import ContextVar
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template, reraise
+from django.template.exceptions import TemplateDoesNotExist
+
+logger = logging.getLogger('main.instrumentation')
+
+_current_metrics = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """Timings and SQL statistics collected while serving one request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view_started = None
+        self.view_time = 0.0
+        self.template_time = 0.0
+        self.sql_time = 0.0
+        self.queries = Counter()
+
+    @property
+    def query_count(self):
+        return sum(self.queries.values())
+
+    @property
+    def duplicate_count(self):
+        """Queries that repeated an earlier query with identical SQL and params"""
+        return sum(count - 1 for count in self.queries.values())
+
+    def similar_count(self):
+        """Queries sharing SQL text with another one (an N+1 hint)"""
+        by_sql = Counter()
+        for (sql, _), count in self.queries.items():
+            by_sql[sql] += count
+        return sum(count for count in by_sql.values() if count > 1)
+
+    def record_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - started
+            self.queries[(sql, repr(params))] += 1
+
+    def server_timing(self, total):
+        return ', '.join([
+            f'db;dur={self.sql_time * 1000:.1f};desc="{self.query_count} queries, '
+            f'{self.duplicate_count} duplicates"',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+            f'view;dur={self.view_time * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ])
+
+
+class InstrumentedTemplate(Template):
+    """Backend template that adds its render time to the current request's metrics"""
+
+    def render(self, context=None, request=None):
+        metrics = _current_metrics.get()
+        if metrics is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.template_time += time.perf_counter() - started
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, returning InstrumentedTemplate objects.
+
+    Selected in settings.TEMPLATES so RequestInstrumentationMiddleware can
+    time rendering without patching Django. Templates included from other
+    templates are rendered by the engine directly and count towards the
+    template that includes them.
+    """
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return InstrumentedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+class RequestInstrumentationMiddleware:
+    """Per-request SQL and timing instrumentation.
+
+    For a sampled request, counts queries on every database connection (with
+    total SQL time and exact-duplicate detection), times template rendering
+    and the view, then reports them in a Server-Timing header and as one JSON
+    log line on the "main.instrumentation" logger. Template time is only
+    measured with the InstrumentedDjangoTemplates backend.
+
+    Controlled by REQUEST_INSTRUMENTATION_ENABLED and
+    REQUEST_INSTRUMENTATION_SAMPLE_RATE (0.0-1.0). Unsampled requests only
+    pay for one random() call.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_INSTRUMENTATION_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = settings.REQUEST_INSTRUMENTATION_SAMPLE_RATE
+
+    def __call__(self, request):
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = _current_metrics.set(metrics)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics.record_query))
+                response = self.get_response(request)
+        finally:
+            _current_metrics.reset(token)
+
+        if metrics.view_started is not None:
+            metrics.view_time = time.perf_counter() - metrics.view_started
+        total = time.perf_counter() - metrics.started
+
+        response['Server-Timing'] = metrics.server_timing(total)
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': metrics.query_count,
+            'duplicate_queries': metrics.duplicate_count,
+            'similar_queries': metrics.similar_count(),
+            'sql_ms': round(metrics.sql_time * 1000, 2),
+            'template_ms': round(metrics.template_time * 1000, 2),
+            'view_ms': round(metrics.view_time * 1000, 2),
+            'total_ms': round(total * 1000, 2),
+        }))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = _current_metrics.get()
+        if metrics is not None:
+            metrics.view_started = time.perf_counter()
+        return None
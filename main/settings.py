@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -25,6 +26,8 @@ SECRET_KEY = "django-insecure-wma2ti=%8p9!&1()=l4v_-@g#!f4b^d^&h=o5tb6jg1%cmx^43
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = True
 
+TESTING = sys.argv[1:2] == ["test"]
+
 ALLOWED_HOSTS = ["*"]
 
 
@@ -43,6 +46,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "main.middleware.RequestInstrumentationMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -57,9 +61,9 @@ ROOT_URLCONF = "main.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        # DjangoTemplates that reports render time to the request instrumentation
+        "BACKEND": "main.middleware.InstrumentedDjangoTemplates",
         "DIRS": [BASE_DIR / "templates"],
-        "APP_DIRS": True,
         "OPTIONS": {
             "context_processors": [
                 "django.template.context_processors.debug",
@@ -68,6 +72,14 @@ TEMPLATES = [
                 "django.contrib.messages.context_processors.messages",
                 "django.template.context_processors.media",
             ],
+            # Compile each template once per process (the development server
+            # still reloads it when the file changes)
+            "loaders": [
+                ("django.template.loaders.cached.Loader", [
+                    "django.template.loaders.filesystem.Loader",
+                    "django.template.loaders.app_directories.Loader",
+                ]),
+            ],
         },
     },
 ]
@@ -86,6 +98,65 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+# "default" holds product rows, their version tokens and the catalog version.
+# Invalidation has to reach every worker process, so it must be a shared
+# backend: the file-based cache works for any number of gunicorn workers on one
+# host; use Memcached or Redis when the site runs on several hosts.
+# "fragments" holds rendered template fragments (product cards, the navbar).
+# Their keys embed everything they depend on, so a per-process cache is safe.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": BASE_DIR / "cache",
+        "OPTIONS": {"MAX_ENTRIES": 5000},
+    },
+    "fragments": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "e-commerce-fragments",
+        # The default of 300 entries is less than one page of cached product cards
+        "OPTIONS": {"MAX_ENTRIES": 20000},
+    },
+}
+
+# Tests never touch the cache/ directory (main.testing.IsolatedCacheTestCase
+# also gives each test empty caches of its own)
+if TESTING:
+    CACHES["default"] = {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "e-commerce-tests"}
+
+PRODUCT_CACHE_ALIAS = "default"
+PRODUCT_CACHE_TIMEOUT = 60 * 60
+FRAGMENT_CACHE_ALIAS = "fragments"
+# Rendered homepage product cards; 0 turns fragment caching off
+PRODUCT_CARD_CACHE_TIMEOUT = 60 * 60
+
+
+# Request instrumentation: SQL/template/view timings as a Server-Timing header
+# and a JSON log line per sampled request (see main/middleware.py)
+
+REQUEST_INSTRUMENTATION_ENABLED = True
+# Off under `manage.py test`, where a log line per test-client request would
+# drown the output (tests that need it use override_settings)
+REQUEST_INSTRUMENTATION_SAMPLE_RATE = 0.0 if TESTING else 1.0 if DEBUG else 0.05
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "main.instrumentation": {
+            "handlers": ["console"],
+            "level": "INFO",
+            "propagate": False,
+        },
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -128,6 +199,43 @@ STATICFILES_STORAGE = "whitenoise.storage.CompressedStaticFilesStorage"
 # Media files
 MEDIA_URL = "media/"
 MEDIA_ROOT = BASE_DIR / "media"
+# Browser cache lifetime of uploads without a content hash in their name;
+# hashed renditions are always cached for a year
+MEDIA_CACHE_MAX_AGE = 60 * 60 * 24
+# When nginx sits in front, set this to an `internal` location aliased to
+# MEDIA_ROOT (e.g. "/protected-media/") and nginx sends the files itself
+MEDIA_ACCEL_REDIRECT = None
+
+# Product image renditions (bounding boxes in pixels) and encoder quality;
+# `manage.py generate_image_renditions --all` re-renders existing images
+IMAGE_RENDITIONS = {
+    "card": (400, 400),
+    "detail": (800, 800),
+    "zoom": (1600, 1600),
+}
+IMAGE_RENDITION_QUALITY = {"webp": 80, "jpg": 82}
+
+# Catalog pagination
+PRODUCTS_PER_PAGE = 24
+# JSON catalog API (/api/products/): default and largest ?limit=
+API_PAGE_SIZE = 100
+API_MAX_PAGE_SIZE = 1000
+
+# Upper bounds of the storefront price facet buckets; the last bucket is
+# open-ended. Run `manage.py rebuild_category_facets` after changing them.
+PRICE_FACET_BOUNDS = [25, 50, 100, 250, 500, 1000]
+
+# shop_admin tables
+ADMIN_ROWS_PER_PAGE = 50
+LOW_STOCK_THRESHOLD = 10
+BULK_ORDER_STATUS_LIMIT = 5000
+# Largest catalog feed (uncompressed bytes) the upload page imports within the
+# request; bigger feeds go through `manage.py import_products`
+CATALOG_UPLOAD_MAX_SIZE = 20 * 1024 * 1024
+
+# Seconds a cart holds the stock it reserved; expired holds are released by
+# `manage.py release_expired_reservations`
+CART_RESERVATION_TTL = 15 * 60
 
 # Login URLs
 LOGIN_URL = "login"
@@ -0,0 +1,25 @@
+import itertools
+from django.conf import settings
+from django.test import TestCase, override_settings
+
+_test_ids = itertools.count()
+
+
+class IsolatedCacheTestCase(TestCase):
+    """TestCase that gives every test its own, empty in-memory caches.
+
+    Each test's database changes are rolled back and SQLite hands the same
+    primary keys out again, so product rows and version tokens cached by an
+    earlier test would otherwise be served to the next one.
+    """
+
+    def setUp(self):
+        super().setUp()
+        test_id = next(_test_ids)
+        caches = override_settings(CACHES={
+            alias: {**config, 'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                    'LOCATION': f'test-{test_id}-{alias}'}
+            for alias, config in settings.CACHES.items()
+        })
+        caches.enable()
+        self.addCleanup(caches.disable)
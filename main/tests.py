@@ -0,0 +1,111 @@
+import os
+import re
+import shutil
+import tempfile
+from decimal import Decimal
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from products.services import ProductService
+from .media import parse_range
+from .testing import IsolatedCacheTestCase
+
+
+@override_settings(REQUEST_INSTRUMENTATION_SAMPLE_RATE=1.0)
+class RequestInstrumentationTests(IsolatedCacheTestCase):
+    def timings(self, response):
+        return dict(
+            (match['name'], match)
+            for match in re.finditer(r'(?P<name>\w+);dur=(?P<dur>[\d.]+)(?:;desc="(?P<desc>[^"]*)")?',
+                                     response['Server-Timing'])
+        )
+
+    def test_server_timing_reports_the_request_queries(self):
+        ProductService.create_product('Novel', '', Decimal('12'), 5, 'Books')
+
+        with self.assertLogs('main.instrumentation') as logs, CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/')
+
+        timings = self.timings(response)
+        self.assertEqual(set(timings), {'db', 'tpl', 'view', 'total'})
+        self.assertEqual(timings['db']['desc'], f'{len(queries)} queries, 0 duplicates')
+        self.assertGreater(float(timings['tpl']['dur']), 0)
+        self.assertIn(f'"queries": {len(queries)}', logs.output[0])
+
+    def test_unsampled_requests_are_not_instrumented(self):
+        with override_settings(REQUEST_INSTRUMENTATION_SAMPLE_RATE=0.0):
+            response = self.client.get('/')
+        self.assertNotIn('Server-Timing', response)
+
+
+class ServeMediaTests(SimpleTestCase):
+    CONTENT = bytes(range(100))
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        os.makedirs(os.path.join(media_root, 'products'))
+        for name in ('products/lamp.jpg', 'products/lamp.0123456789abcdef.webp'):
+            with open(os.path.join(media_root, name), 'wb') as file:
+                file.write(self.CONTENT)
+        settings = override_settings(MEDIA_ROOT=media_root, MEDIA_CACHE_MAX_AGE=600, MEDIA_ACCEL_REDIRECT=None)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def get(self, path='/media/products/lamp.jpg', **headers):
+        return self.client.get(path, headers=headers)
+
+    def test_full_file_with_validators_and_cache_headers(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.CONTENT)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=600')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertTrue(response['ETag'].startswith('"'))
+
+        hashed = self.get('/media/products/lamp.0123456789abcdef.webp')
+        self.assertEqual(hashed['Cache-Control'], 'public, max-age=31536000, immutable')
+
+    def test_revalidation_answers_304(self):
+        etag = self.get()['ETag']
+        response = self.get(If_None_Match=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(self.get(If_None_Match='"other"').status_code, 200)
+
+    def test_byte_ranges(self):
+        response = self.get(Range='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/100')
+        self.assertEqual(b''.join(response.streaming_content), self.CONTENT[10:20])
+
+        suffix = self.get(Range='bytes=-5')
+        self.assertEqual(suffix['Content-Range'], 'bytes 95-99/100')
+        self.assertEqual(b''.join(suffix.streaming_content), self.CONTENT[95:])
+
+        unsatisfiable = self.get(Range='bytes=100-')
+        self.assertEqual(unsatisfiable.status_code, 416)
+        self.assertEqual(unsatisfiable['Content-Range'], 'bytes */100')
+
+        # A stale If-Range gets the whole file
+        self.assertEqual(self.get(Range='bytes=0-9', If_Range='"stale"').status_code, 200)
+
+    def test_parse_range(self):
+        self.assertEqual(parse_range('bytes=0-', 100), (0, 99))
+        self.assertEqual(parse_range('bytes=90-500', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=-500', 100), (0, 99))
+        self.assertIsNone(parse_range('bytes=0-1,5-6', 100))
+        self.assertIsNone(parse_range('bytes=9-1', 100))
+        self.assertEqual(parse_range('bytes=-0', 100), 'invalid')
+
+    def test_missing_files_traversal_and_unsafe_methods(self):
+        self.assertEqual(self.get('/media/products/missing.jpg').status_code, 404)
+        self.assertEqual(self.get('/media/../main/settings.py').status_code, 404)
+        self.assertEqual(self.get('/media/products').status_code, 404)
+        self.assertEqual(self.client.post('/media/products/lamp.jpg').status_code, 405)
+
+    def test_accel_redirect_hands_the_body_to_nginx(self):
+        with override_settings(MEDIA_ACCEL_REDIRECT='/protected-media/'):
+            response = self.get()
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/products/lamp.jpg')
+        self.assertEqual(response.content, b'')
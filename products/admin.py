@@ -1,9 +1,28 @@
 from django.contrib import admin
-from .models import Product
+from .models import Product, StockReservation
+from .services import ProductService
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
-    list_display = ['name', 'category', 'price', 'stock', 'is_active', 'created_at']
+    list_display = ['name', 'sku', 'category', 'price', 'stock', 'reserved', 'is_active', 'created_at']
     list_filter = ['category', 'is_active', 'created_at']
-    search_fields = ['name', 'description', 'category']
+    search_fields = ['name', 'sku', 'description', 'category']
     list_editable = ['price', 'stock', 'is_active']
+
+    def save_model(self, request, obj, form, change):
+        """Save through ProductService (change form and list_editable alike) so the
+        product cache, dashboard stats, facets and search index follow the edit"""
+        if change:
+            changed = {name: getattr(obj, name) for name in form.changed_data}
+            if changed:
+                ProductService.update_product(obj.pk, **changed)
+            return
+        product = ProductService.create_product(
+            obj.name, obj.description, obj.price, obj.stock, obj.category, image=obj.image or None
+        )
+        extra = {name: getattr(obj, name) for name in ('sku', 'is_active', 'reserved')
+                 if getattr(obj, name) != getattr(product, name)}
+        if extra:
+            ProductService.update_product(product.pk, **extra)
+        obj.pk = product.pk
+        obj.refresh_from_db()
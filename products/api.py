@@ -0,0 +1,155 @@
+import hashlib
+import json
+from decimal import Decimal, InvalidOperation
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import condition, require_safe
+from .cache import ProductCache
+from .models import Product
+from .pagination import InvalidCursor
+from .services import ProductService
+
+
+def _images(renditions, image):
+    """Rendition URLs per size, or the original upload as 'original'"""
+    if renditions:
+        return {
+            size: {
+                'width': rendition['width'],
+                'height': rendition['height'],
+                'webp': default_storage.url(rendition['webp']),
+                'jpg': default_storage.url(rendition['jpg']),
+            }
+            for size, rendition in renditions.items()
+        }
+    return {'original': default_storage.url(image)} if image else {}
+
+
+# Public field name -> (columns it is read from, function of the row dict)
+FIELDS = {
+    'id': (['id'], lambda row: row['id']),
+    'sku': (['sku'], lambda row: row['sku']),
+    'name': (['name'], lambda row: row['name']),
+    'description': (['description'], lambda row: row['description']),
+    'category': (['category'], lambda row: row['category']),
+    'price': (['price'], lambda row: row['price']),
+    'available_stock': (['stock', 'reserved'], lambda row: max(row['stock'] - row['reserved'], 0)),
+    'images': (['image', 'renditions'], lambda row: _images(row['renditions'], row['image'])),
+    'created_at': (['created_at'], lambda row: row['created_at']),
+    'updated_at': (['updated_at'], lambda row: row['updated_at']),
+}
+
+
+class BadRequest(Exception):
+    pass
+
+
+def _fields(request):
+    """Requested field names (all by default); raises BadRequest on unknown ones"""
+    names = [name.strip() for name in request.GET.get('fields', '').split(',') if name.strip()]
+    unknown = [name for name in names if name not in FIELDS]
+    if unknown:
+        raise BadRequest(f"Unknown field(s): {', '.join(unknown)}. Available: {', '.join(FIELDS)}")
+    return list(dict.fromkeys(names)) or list(FIELDS)
+
+
+def _columns(fields):
+    return list(dict.fromkeys(column for name in fields for column in FIELDS[name][0]))
+
+
+def _serialize(rows, fields):
+    """Plain dicts of the requested fields, straight from .values() rows"""
+    getters = [(name, FIELDS[name][1]) for name in fields]
+    return [{name: getter(row) for name, getter in getters} for row in rows]
+
+
+def _decimal(request, name):
+    value = request.GET.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        number = Decimal(value)
+    except InvalidOperation:
+        raise BadRequest(f'{name} must be a number')
+    # NaN and Infinity parse but are not valid prices
+    if not number.is_finite():
+        raise BadRequest(f'{name} must be a number')
+    return number
+
+
+def _json(data, status=200):
+    return HttpResponse(
+        json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':')),
+        status=status,
+        content_type='application/json',
+    )
+
+
+def _etag(request, product_id=None):
+    # Responses depend only on the catalog and the URL, never on the visitor
+    token = ProductCache.catalog_version()[0]
+    return hashlib.blake2b(f'{token}|{request.get_full_path()}'.encode(), digest_size=16).hexdigest()
+
+
+def _last_modified(request, product_id=None):
+    return ProductCache.catalog_version()[1]
+
+
+def api_view(view):
+    """GET/HEAD only, validators checked before any query, gzip, revalidated caching"""
+    view = condition(etag_func=_etag, last_modified_func=_last_modified)(view)
+    view = cache_control(public=True, no_cache=True)(view)
+    return require_safe(gzip_page(view))
+
+
+@api_view
+def product_list(request):
+    """Active products, newest first (best match first with ?q=).
+
+    Query parameters: fields (comma-separated), q, category, min_price,
+    max_price, limit and cursor (the next/previous value of an earlier page).
+    """
+    try:
+        fields = _fields(request)
+        min_price = _decimal(request, 'min_price')
+        max_price = _decimal(request, 'max_price')
+        try:
+            limit = min(max(int(request.GET.get('limit', settings.API_PAGE_SIZE)), 1), settings.API_MAX_PAGE_SIZE)
+        except ValueError:
+            raise BadRequest('limit must be an integer')
+        page = ProductService.get_catalog_rows(
+            _columns(fields),
+            query=request.GET.get('q', ''),
+            category=request.GET.get('category', '').strip() or None,
+            min_price=min_price,
+            max_price=max_price,
+            cursor=request.GET.get('cursor'),
+            per_page=limit,
+        )
+    except BadRequest as error:
+        return _json({'error': str(error)}, status=400)
+    except InvalidCursor:
+        return _json({'error': 'Invalid cursor'}, status=400)
+
+    return _json({
+        'results': _serialize(page.object_list, fields),
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+
+
+@api_view
+def product_detail(request, product_id):
+    """One active product; supports the same fields parameter as the list"""
+    try:
+        fields = _fields(request)
+    except BadRequest as error:
+        return _json({'error': str(error)}, status=400)
+    rows = list(Product.objects.filter(id=product_id, is_active=True).values(*_columns(fields)))
+    if not rows:
+        return _json({'error': 'Product not found'}, status=404)
+    return _json(_serialize(rows, fields)[0])
@@ -0,0 +1,126 @@
+import threading
+import uuid
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+
+CATALOG_VERSION_KEY = 'catalog:version'
+
+
+class ProductCache:
+    """Versioned read-through cache for single products.
+
+    Every product has a version token stored under its own key; the cached
+    row lives under a key that embeds that token. Writers never delete
+    cached rows, they just give the product a new version, so stale entries
+    become unreachable on every process sharing the cache backend and age
+    out on their own. Version tokens are random rather than counters, so a
+    version key evicted by the backend can never bring an old row back.
+
+    Every invalidation also replaces the catalog version, a token plus the
+    time it changed, which the storefront pages use as their validator.
+    """
+
+    _lock = threading.Lock()
+    _stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+    @staticmethod
+    def get_cache():
+        return caches[settings.PRODUCT_CACHE_ALIAS]
+
+    @staticmethod
+    def version_key(product_id):
+        return f'product:{product_id}:version'
+
+    @staticmethod
+    def get(product_id, loader):
+        """Return the cached product, calling loader() to fill the cache on a miss.
+
+        loader() may return None (e.g. for an inactive product); that result
+        is not cached.
+        """
+        cache = ProductCache.get_cache()
+        version = cache.get(ProductCache.version_key(product_id))
+        if version is None:
+            version = ProductCache._new_version()
+            cache.add(ProductCache.version_key(product_id), version, None)
+            version = cache.get(ProductCache.version_key(product_id), version)
+
+        key = f'product:{product_id}:{version}'
+        product = cache.get(key)
+        if product is not None:
+            ProductCache._count('hits')
+            return product
+
+        ProductCache._count('misses')
+        product = loader()
+        if product is not None:
+            cache.set(key, product, settings.PRODUCT_CACHE_TIMEOUT)
+        return product
+
+    @staticmethod
+    def invalidate(product_id):
+        """Make every cached copy of a product unreachable"""
+        ProductCache.invalidate_many([product_id])
+
+    @staticmethod
+    def invalidate_many(product_ids):
+        """Bump the version of several products with a single cache call"""
+        product_ids = list(product_ids)
+        if not product_ids:
+            return
+        versions = {ProductCache.version_key(pid): ProductCache._new_version() for pid in product_ids}
+        versions[CATALOG_VERSION_KEY] = (ProductCache._new_version(), timezone.now())
+        ProductCache.get_cache().set_many(versions, None)
+        ProductCache._count('invalidations', len(product_ids))
+
+    @staticmethod
+    def catalog_version():
+        """(token, changed_at) of the whole catalog; replaced whenever any product changes"""
+        cache = ProductCache.get_cache()
+        version = cache.get(CATALOG_VERSION_KEY)
+        if version is None:
+            version = (ProductCache._new_version(), timezone.now())
+            cache.add(CATALOG_VERSION_KEY, version, None)
+            version = cache.get(CATALOG_VERSION_KEY, version)
+        return version
+
+    @staticmethod
+    def touch_catalog():
+        """Replace the catalog version after changes that bypass invalidate_many()"""
+        ProductCache.get_cache().set(CATALOG_VERSION_KEY, (ProductCache._new_version(), timezone.now()), None)
+
+    @staticmethod
+    def invalidate_on_commit(product_ids):
+        """Invalidate once the current transaction commits.
+
+        Invalidating earlier would let a concurrent reader cache the
+        pre-commit row again under the new version.
+        """
+        product_ids = list(product_ids)
+        transaction.on_commit(lambda: ProductCache.invalidate_many(product_ids))
+
+    @staticmethod
+    def stats():
+        """Hit/miss/invalidation counters for this process"""
+        with ProductCache._lock:
+            stats = dict(ProductCache._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+    @staticmethod
+    def reset_stats():
+        with ProductCache._lock:
+            for name in ProductCache._stats:
+                ProductCache._stats[name] = 0
+
+    @staticmethod
+    def _count(name, amount=1):
+        with ProductCache._lock:
+            ProductCache._stats[name] += amount
+
+    @staticmethod
+    def _new_version():
+        return uuid.uuid4().hex[:16]
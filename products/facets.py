@@ -0,0 +1,127 @@
+from bisect import bisect_right
+from collections import Counter
+from decimal import Decimal
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, F, Q, Value, When
+from .cache import ProductCache
+from .models import CategoryFacet, Product
+
+
+class CategoryFacets:
+    """Category and price-range facet counts for the storefront.
+
+    CategoryFacet holds the number of active products per (category, price
+    bucket), so building the sidebar reads O(categories x buckets) rows
+    instead of grouping the catalog on every request. ProductService and the
+    catalog importer keep it in sync by passing the facet key of each
+    product before and after a write to move(); any other code that changes
+    category, price or is_active in bulk should call rebuild() afterwards.
+    """
+
+    @staticmethod
+    def bucket(price):
+        """Index of the price bucket `price` falls in"""
+        return bisect_right(settings.PRICE_FACET_BOUNDS, Decimal(str(price)))
+
+    @staticmethod
+    def key(category, price, is_active):
+        """Facet row a product counts towards, or None for an inactive product"""
+        if not is_active:
+            return None
+        return category, CategoryFacets.bucket(price)
+
+    @staticmethod
+    def move(changes):
+        """Apply (old key, new key) pairs, one per written product; None means not counted"""
+        delta = Counter()
+        for old, new in changes:
+            if old == new:
+                continue
+            if old is not None:
+                delta[old] -= 1
+            if new is not None:
+                delta[new] += 1
+        CategoryFacets.apply(delta)
+
+    @staticmethod
+    def apply(delta):
+        """Add per-key deltas to the counts: one insert for new keys, one UPDATE per distinct delta"""
+        delta = {key: amount for key, amount in delta.items() if amount}
+        if not delta:
+            return
+        CategoryFacet.objects.bulk_create(
+            [CategoryFacet(category=category, bucket=bucket) for category, bucket in delta],
+            ignore_conflicts=True
+        )
+        by_amount = {}
+        for key, amount in delta.items():
+            by_amount.setdefault(amount, []).append(key)
+        for amount, keys in by_amount.items():
+            match = Q()
+            for category, bucket in keys:
+                match |= Q(category=category, bucket=bucket)
+            CategoryFacet.objects.filter(match).update(products=F('products') + amount)
+
+    @staticmethod
+    def price_range(bucket):
+        """Q matching the prices of a bucket, or None for an unknown bucket"""
+        bounds = settings.PRICE_FACET_BOUNDS
+        if not 0 <= bucket <= len(bounds):
+            return None
+        condition = Q()
+        if bucket > 0:
+            condition &= Q(price__gte=bounds[bucket - 1])
+        if bucket < len(bounds):
+            condition &= Q(price__lt=bounds[bucket])
+        return condition
+
+    @staticmethod
+    def label(bucket):
+        bounds = settings.PRICE_FACET_BOUNDS
+        if bucket == 0:
+            return f'Under ${bounds[0]}'
+        if bucket == len(bounds):
+            return f'${bounds[-1]} and up'
+        return f'${bounds[bucket - 1]} to ${bounds[bucket]}'
+
+    @staticmethod
+    def get_facets(category=None, bucket=None):
+        """Sidebar counts: categories within the selected price bucket and
+        price buckets within the selected category"""
+        categories = Counter()
+        buckets = Counter()
+        for name, row_bucket, count in CategoryFacet.objects.filter(products__gt=0) \
+                .values_list('category', 'bucket', 'products'):
+            if bucket is None or row_bucket == bucket:
+                categories[name] += count
+            if category is None or name == category:
+                buckets[row_bucket] += count
+        return {
+            'categories': [
+                {'name': name, 'count': count} for name, count in sorted(categories.items())
+            ],
+            'prices': [
+                {'bucket': index, 'label': CategoryFacets.label(index), 'count': buckets[index]}
+                for index in range(len(settings.PRICE_FACET_BOUNDS) + 1) if buckets[index]
+            ],
+        }
+
+    @staticmethod
+    @transaction.atomic
+    def rebuild():
+        """Recount every facet from the products table; returns the number of facet rows"""
+        bounds = settings.PRICE_FACET_BOUNDS
+        bucket = Case(
+            *[When(price__lt=bound, then=Value(index)) for index, bound in enumerate(bounds)],
+            default=Value(len(bounds))
+        )
+        counts = Product.objects.filter(is_active=True).order_by() \
+            .annotate(bucket=bucket).values('category', 'bucket').annotate(n=Count('id'))
+        CategoryFacet.objects.all().delete()
+        facets = CategoryFacet.objects.bulk_create([
+            CategoryFacet(category=row['category'], bucket=row['bucket'], products=row['n'])
+            for row in counts
+        ])
+        transaction.on_commit(ProductCache.touch_catalog)
+        return len(facets)
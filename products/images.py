@@ -0,0 +1,87 @@
+import hashlib
+import io
+import os
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils.text import get_valid_filename
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+RENDITION_DIR = 'products/renditions'
+# Pillow format name and encoder options per stored extension
+FORMATS = {
+    'webp': ('WEBP', {'method': 4}),
+    'jpg': ('JPEG', {'optimize': True, 'progressive': True}),
+}
+
+
+class ProductImages:
+    """Fixed-size WebP and JPEG renditions of product images.
+
+    Every size in settings.IMAGE_RENDITIONS is produced from one decode of
+    the original: the image is rotated upright from its EXIF orientation,
+    flattened to RGB and then shrunk step by step from the largest size to
+    the smallest, never enlarged. Renditions are saved without EXIF, ICC or
+    any other metadata, under names that embed a hash of their content, so
+    they never change once written and identical uploads share files.
+
+    Product.renditions maps each size name to
+    {'width', 'height', 'webp', 'jpg'}, the last two being storage paths.
+    """
+
+    @staticmethod
+    def render(file):
+        """Encode every rendition of an image file: {size: (width, height, {ext: bytes})}"""
+        sizes = sorted(settings.IMAGE_RENDITIONS.items(), key=lambda item: item[1], reverse=True)
+        file.seek(0)
+        try:
+            with Image.open(file) as original:
+                # Let the JPEG decoder scale down while decoding
+                original.draft('RGB', sizes[0][1])
+                image = ImageOps.exif_transpose(original)
+                image = ProductImages._flatten(image)
+        except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+            raise ValidationError('Upload a valid image; the file is not an image or is corrupted')
+        finally:
+            file.seek(0)
+
+        renditions = {}
+        for name, box in sizes:
+            image.thumbnail(box, Image.Resampling.LANCZOS)
+            encoded = {}
+            for ext, (image_format, options) in FORMATS.items():
+                buffer = io.BytesIO()
+                image.save(buffer, image_format, quality=settings.IMAGE_RENDITION_QUALITY[ext], **options)
+                encoded[ext] = buffer.getvalue()
+            renditions[name] = (image.width, image.height, encoded)
+        return renditions
+
+    @staticmethod
+    def generate(file, name=None):
+        """Render and store the renditions of an image file; returns the Product.renditions value"""
+        stem = get_valid_filename(os.path.splitext(os.path.basename(name or file.name))[0])[:40]
+        renditions = {}
+        for size, (width, height, encoded) in ProductImages.render(file).items():
+            rendition = {'width': width, 'height': height}
+            for ext, content in encoded.items():
+                digest = hashlib.sha256(content).hexdigest()[:16]
+                path = f'{RENDITION_DIR}/{stem}-{size}.{digest}.{ext}'
+                # Same name means same bytes, so an existing file is already right
+                if not default_storage.exists(path):
+                    path = default_storage.save(path, ContentFile(content))
+                rendition[ext] = path
+            renditions[size] = rendition
+        return renditions
+
+    @staticmethod
+    def _flatten(image):
+        """RGB copy without metadata; transparent areas become white"""
+        if image.mode in ('RGBA', 'LA', 'PA') or (image.mode == 'P' and 'transparency' in image.info):
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, 'white')
+            background.paste(image, mask=image.getchannel('A'))
+            return background
+        flat = image.convert('RGB')
+        flat.info = {}
+        return flat
@@ -0,0 +1,184 @@
+import csv
+import json
+import time
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from .cache import ProductCache
+from .facets import CategoryFacets
+from .models import Product
+from .search import ProductSearchIndex
+from shop_admin.services import StatsService
+
+IMPORT_FIELDS = ('sku', 'name', 'description', 'price', 'stock', 'category', 'is_active')
+REQUIRED_FIELDS = ('sku', 'name', 'price', 'stock', 'category')
+# Columns an import overwrites on an existing SKU; stock reservations and
+# created_at stay as they are
+UPDATE_FIELDS = ['name', 'description', 'price', 'stock', 'category', 'is_active', 'updated_at']
+
+
+class ImportResult:
+    """Counters for one catalog import"""
+
+    MAX_ERRORS_KEPT = 100
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.error_count = 0
+        self.errors = []
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def rows_per_second(self):
+        return self.rows / max(self.elapsed, 1e-9)
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < self.MAX_ERRORS_KEPT:
+            self.errors.append((line, message))
+
+
+class CatalogImporter:
+    """Streaming CSV / JSON Lines catalog import, upserting on Product.sku.
+
+    Rows are read one at a time, validated with the model fields and written
+    in batches with bulk_create(update_conflicts=True), one transaction per
+    batch, so memory stays flat however large the feed is. Only the first
+    ImportResult.MAX_ERRORS_KEPT error messages are kept. Each batch also
+    refreshes the search index, the dashboard counters, the category facets
+    and the product cache for the rows it wrote.
+
+    CSV files need a header row; JSON Lines files hold one object per line.
+    Both use the IMPORT_FIELDS names; description and is_active are optional,
+    and a row without is_active leaves an existing product's flag alone.
+    """
+
+    FORMATS = ('csv', 'jsonl')
+
+    def __init__(self, batch_size=1000, progress=None):
+        self.batch_size = batch_size
+        self.progress = progress
+
+    @staticmethod
+    def detect_format(filename):
+        """'csv' or 'jsonl' from a file name (ignoring a trailing .gz), else None"""
+        name = filename.lower().removesuffix('.gz')
+        if name.endswith('.csv'):
+            return 'csv'
+        if name.endswith(('.jsonl', '.ndjson', '.json')):
+            return 'jsonl'
+        return None
+
+    def run(self, stream, file_format):
+        """Import every row of a text stream; returns an ImportResult"""
+        result = ImportResult()
+        batch = {}
+        for line, row in self.read_rows(stream, file_format, result):
+            product = self.build_product(line, row, result)
+            if product is None:
+                continue
+            # Last occurrence wins; a batch must not upsert the same SKU twice
+            batch[product.sku] = product
+            if len(batch) >= self.batch_size:
+                self.write_batch(list(batch.values()), result)
+                batch.clear()
+        if batch:
+            self.write_batch(list(batch.values()), result)
+        return result
+
+    def read_rows(self, stream, file_format, result):
+        """Yield (line number, dict) pairs; unreadable lines are recorded as errors"""
+        if file_format == 'csv':
+            reader = csv.DictReader(stream)
+            missing = [field for field in REQUIRED_FIELDS if field not in (reader.fieldnames or [])]
+            if missing:
+                result.add_error(1, f"Missing column(s): {', '.join(missing)}")
+                return
+            for row in reader:
+                result.rows += 1
+                yield reader.line_num, row
+        elif file_format == 'jsonl':
+            for line, text in enumerate(stream, start=1):
+                if not text.strip():
+                    continue
+                result.rows += 1
+                try:
+                    row = json.loads(text)
+                except ValueError as error:
+                    result.add_error(line, f'Invalid JSON: {error}')
+                    continue
+                if not isinstance(row, dict):
+                    result.add_error(line, 'Expected a JSON object')
+                    continue
+                yield line, row
+        else:
+            raise ValueError(f'Unsupported format {file_format!r}')
+
+    def build_product(self, line, row, result):
+        """A validated, unsaved Product for one row, or None after recording the error"""
+        values = {}
+        for name in IMPORT_FIELDS:
+            value = row.get(name)
+            if isinstance(value, str):
+                value = value.strip()
+            if value in (None, ''):
+                if name in REQUIRED_FIELDS:
+                    result.add_error(line, f'{name}: required')
+                    return None
+                continue
+            try:
+                values[name] = Product._meta.get_field(name).clean(value, None)
+            except ValidationError as error:
+                result.add_error(line, f"{name}: {' '.join(error.messages)}")
+                return None
+        values.setdefault('description', '')
+        # Resolved per batch: new products default to active, existing ones keep their flag
+        values.setdefault('is_active', None)
+        return Product(**values)
+
+    def write_batch(self, products, result):
+        with transaction.atomic():
+            existing = {
+                sku: (is_active, category, price) for sku, is_active, category, price in
+                Product.objects.filter(sku__in=[product.sku for product in products])
+                .values_list('sku', 'is_active', 'category', 'price')
+            }
+            for product in products:
+                if product.is_active is None:
+                    product.is_active = existing[product.sku][0] if product.sku in existing else True
+            Product.objects.bulk_create(
+                products,
+                update_conflicts=True,
+                unique_fields=['sku'],
+                update_fields=UPDATE_FIELDS,
+            )
+
+            created = 0
+            active_delta = 0
+            facets = []
+            for product in products:
+                new_facet = CategoryFacets.key(product.category, product.price, product.is_active)
+                if product.sku not in existing:
+                    created += 1
+                    active_delta += product.is_active
+                    facets.append((None, new_facet))
+                    continue
+                was_active, category, price = existing[product.sku]
+                if product.is_active != was_active:
+                    active_delta += 1 if product.is_active else -1
+                facets.append((CategoryFacets.key(category, price, was_active), new_facet))
+            StatsService.increment(products=created, active_products=active_delta)
+            CategoryFacets.move(facets)
+
+            ProductSearchIndex.index_products(products)
+            ProductCache.invalidate_on_commit([product.id for product in products])
+
+        result.created += created
+        result.updated += len(products) - created
+        if self.progress:
+            self.progress(result)
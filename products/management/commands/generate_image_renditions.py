@@ -0,0 +1,81 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+from django.utils import timezone
+from products.cache import ProductCache
+from products.images import ProductImages
+from products.models import Product
+
+
+def render_stored(name):
+    """Generate the renditions of one stored image; returns (renditions, error)"""
+    try:
+        with default_storage.open(name) as file:
+            return ProductImages.generate(file, name), None
+    except (ValidationError, OSError) as error:
+        message = ' '.join(error.messages) if isinstance(error, ValidationError) else str(error)
+        return None, message
+
+
+class Command(BaseCommand):
+    help = 'Generate the card, detail and zoom renditions of existing product images in worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--batch-size', type=int, default=200,
+                            help='Products read and updated per batch')
+        parser.add_argument('--all', action='store_true',
+                            help='Re-render products that already have renditions')
+
+    def handle(self, *args, **options):
+        products = Product.objects.exclude(image='').exclude(image__isnull=True)
+        if not options['all']:
+            products = products.filter(renditions={})
+
+        done = failed = 0
+        last_id = 0
+        started = time.perf_counter()
+        with ProcessPoolExecutor(options['workers'], mp_context=get_context('fork')) as executor:
+            while True:
+                batch = list(
+                    products.filter(id__gt=last_id).order_by('id')
+                    .values_list('id', 'image')[:options['batch_size']]
+                )
+                if not batch:
+                    break
+                last_id = batch[-1][0]
+
+                # Workers are forked on demand and must not inherit an open connection
+                connections.close_all()
+                rendered = {}
+                results = executor.map(render_stored, [name for _, name in batch], chunksize=4)
+                for (product_id, name), (renditions, error) in zip(batch, results):
+                    if error:
+                        failed += 1
+                        self.stderr.write(f'  product {product_id} ({name}): {error}')
+                    else:
+                        rendered[product_id] = renditions
+                self.save(rendered)
+
+                done += len(rendered)
+                elapsed = max(time.perf_counter() - started, 1e-9)
+                self.stdout.write(f'  {done} products rendered, {failed} failed ({done / elapsed:,.1f} images/sec)')
+
+        summary = f'Rendered {done} product images in {time.perf_counter() - started:.1f}s, {failed} failed'
+        self.stdout.write(self.style.WARNING(summary) if failed else self.style.SUCCESS(summary))
+
+    def save(self, rendered):
+        """Store one batch of renditions; updated_at moves so cached pages are refreshed"""
+        if not rendered:
+            return
+        now = timezone.now()
+        products = [Product(id=product_id, renditions=renditions, updated_at=now)
+                    for product_id, renditions in rendered.items()]
+        with transaction.atomic():
+            Product.objects.bulk_update(products, ['renditions', 'updated_at'])
+            ProductCache.invalidate_on_commit(rendered)
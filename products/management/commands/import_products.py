@@ -0,0 +1,56 @@
+import gzip
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from products.importer import CatalogImporter
+
+
+class Command(BaseCommand):
+    help = (
+        'Stream a CSV or JSON Lines catalog feed (optionally gzipped) and upsert its '
+        'rows on SKU in batches'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Feed file, or - to read standard input')
+        parser.add_argument('--format', choices=CatalogImporter.FORMATS,
+                            help='Feed format; guessed from the file extension by default')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Rows upserted per INSERT ... ON CONFLICT statement')
+        parser.add_argument('--encoding', default='utf-8-sig')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or CatalogImporter.detect_format(path)
+        if file_format is None:
+            raise CommandError('Cannot tell the feed format from the file name; pass --format')
+
+        importer = CatalogImporter(options['batch_size'], progress=self.progress)
+        if path == '-':
+            result = importer.run(sys.stdin, file_format)
+        else:
+            opener = gzip.open if path.endswith('.gz') else open
+            try:
+                with opener(path, 'rt', encoding=options['encoding'], newline='') as stream:
+                    result = importer.run(stream, file_format)
+            except OSError as error:
+                raise CommandError(str(error))
+
+        for line, message in result.errors:
+            self.stderr.write(f'  line {line}: {message}')
+        if result.error_count > len(result.errors):
+            self.stderr.write(f'  ... and {result.error_count - len(result.errors)} more')
+
+        summary = (
+            f'{result.rows} rows in {result.elapsed:.1f}s ({result.rows_per_second:,.0f} rows/sec): '
+            f'{result.created} created, {result.updated} updated, {result.error_count} rejected'
+        )
+        if result.error_count:
+            self.stdout.write(self.style.WARNING(summary))
+        else:
+            self.stdout.write(self.style.SUCCESS(summary))
+
+    def progress(self, result):
+        self.stdout.write(
+            f'  {result.rows} rows, {result.created + result.updated} written, '
+            f'{result.error_count} rejected ({result.rows_per_second:,.0f} rows/sec)'
+        )
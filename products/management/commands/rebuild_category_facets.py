@@ -0,0 +1,15 @@
+import time
+from django.core.management.base import BaseCommand
+from products.facets import CategoryFacets
+
+
+class Command(BaseCommand):
+    help = 'Recount the storefront category and price facets from the products table'
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = CategoryFacets.rebuild()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {count} facet rows in {elapsed:.2f}s'
+        ))
@@ -0,0 +1,21 @@
+import time
+from django.core.management.base import BaseCommand
+from products.search import ProductSearchIndex
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the product full-text search index from the products table'
+
+    def handle(self, *args, **options):
+        if not ProductSearchIndex.is_available():
+            self.stdout.write(self.style.WARNING(
+                'Full-text search requires SQLite FTS5; searches use icontains on this backend'
+            ))
+            return
+
+        started = time.perf_counter()
+        count = ProductSearchIndex.rebuild()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {count} products in {elapsed:.2f}s'
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from products.services import ReservationService
+
+
+class Command(BaseCommand):
+    help = 'Return stock held by expired cart reservations'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Reservations released per UPDATE/DELETE round')
+
+    def handle(self, *args, **options):
+        removed = ReservationService.sweep_expired(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Released {removed} expired reservations'))
@@ -0,0 +1,44 @@
+# Generated by Django 6.0.1 on 2026-10-18 17:28
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Case, Count, Value, When
+
+
+def count_facets(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    CategoryFacet = apps.get_model('products', 'CategoryFacet')
+    bounds = settings.PRICE_FACET_BOUNDS
+    bucket = Case(
+        *[When(price__lt=bound, then=Value(index)) for index, bound in enumerate(bounds)],
+        default=Value(len(bounds))
+    )
+    counts = Product.objects.filter(is_active=True).order_by() \
+        .annotate(bucket=bucket).values('category', 'bucket').annotate(n=Count('id'))
+    CategoryFacet.objects.bulk_create([
+        CategoryFacet(category=row['category'], bucket=row['bucket'], products=row['n'])
+        for row in counts
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_product_active_partial_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryFacet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(max_length=100)),
+                ('bucket', models.PositiveSmallIntegerField()),
+                ('products', models.IntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('category', 'bucket')},
+            },
+        ),
+        migrations.RunPython(count_facets, migrations.RunPython.noop),
+    ]
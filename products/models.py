@@ -1,13 +1,19 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator
+from django.utils import timezone
 
 class Product(models.Model):
+    # Supplier stock-keeping unit; the key catalog imports upsert on
+    sku = models.CharField(max_length=64, unique=True, null=True, blank=True)
     name = models.CharField(max_length=200)
     description = models.TextField()
     price = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0)])
     stock = models.IntegerField(validators=[MinValueValidator(0)])
+    reserved = models.IntegerField(default=0, validators=[MinValueValidator(0)])
     image = models.ImageField(upload_to='products/', blank=True, null=True)
+    # Resized copies of image, written by products.images.ProductImages
+    renditions = models.JSONField(default=dict, blank=True)
     category = models.CharField(max_length=100)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -16,5 +22,69 @@ class Product(models.Model):
     def __str__(self):
         return self.name
 
+    @property
+    def available_stock(self):
+        """Stock not held by any cart reservation"""
+        return max(self.stock - self.reserved, 0)
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Storefront: the active catalog by (created_at, id), all of it or one
+            # category. Partial rather than led by is_active: SQLite compiles
+            # is_active=True to a bare WHERE "is_active", which can only use an
+            # index through a matching partial index condition.
+            models.Index(fields=['created_at', 'id'], condition=models.Q(is_active=True),
+                         name='product_active_created_idx'),
+            models.Index(fields=['category', 'created_at', 'id'], condition=models.Q(is_active=True),
+                         name='product_active_category_idx'),
+            # shop_admin product table: unfiltered or by category, and one
+            # (field, id) index per sort so keyset pages never sort the table
+            models.Index(fields=['created_at', 'id'], name='product_created_idx'),
+            models.Index(fields=['category', 'created_at', 'id'], name='product_category_created_idx'),
+            models.Index(fields=['name', 'id'], name='product_name_idx'),
+            models.Index(fields=['price', 'id'], name='product_price_idx'),
+            # Also serves the low stock filter
+            models.Index(fields=['stock', 'id'], name='product_stock_idx'),
+        ]
+
+
+class CategoryFacet(models.Model):
+    """Number of active products per (category, price bucket).
+
+    Maintained incrementally by products.facets.CategoryFacets so the
+    storefront facet sidebar reads a few dozen rows instead of grouping the
+    whole catalog. Buckets are indexes into settings.PRICE_FACET_BOUNDS.
+    """
+    category = models.CharField(max_length=100)
+    bucket = models.PositiveSmallIntegerField()
+    products = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.category} [{self.bucket}]: {self.products}"
+
+    class Meta:
+        unique_together = ('category', 'bucket')
+
+
+class StockReservation(models.Model):
+    """Units of a product held for a user's cart until expires_at.
+
+    The sum of all reservation quantities for a product is mirrored in
+    Product.reserved, so availability checks never need to aggregate this
+    table. Expired rows keep counting until they are swept.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='stock_reservations')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reservations')
+    quantity = models.IntegerField(validators=[MinValueValidator(1)])
+    expires_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.user.username} - {self.product.name} x {self.quantity}"
+
+    def is_expired(self):
+        return self.expires_at <= timezone.now()
+
+    class Meta:
+        unique_together = ('user', 'product')
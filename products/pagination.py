@@ -0,0 +1,146 @@
+import base64
+import binascii
+import json
+import math
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class KeysetPage:
+    """One page of keyset-paginated results"""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None, has_previous=False):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self._has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self._has_previous
+
+
+class KeysetPaginator:
+    """Cursor (keyset) pagination over a queryset.
+
+    `ordering` must end in a unique field (normally the primary key) so
+    every row has a distinct position. Instead of OFFSET, each page filters
+    on the ordering values of the last row seen, so any page costs the same
+    as the first one when an index covers the ordering.
+
+    Cursors are opaque url-safe strings; a page reached through a
+    "previous" cursor that turns out to be the first page has
+    previous_cursor set to None and has_previous() False.
+    """
+
+    def __init__(self, queryset, ordering, per_page):
+        self.queryset = queryset
+        self.ordering = [
+            (name.lstrip('-'), name.startswith('-')) for name in ordering
+        ]
+        self.per_page = per_page
+
+    def get_page(self, cursor=None):
+        """Return the page a cursor points at, or the first page for no cursor"""
+        direction, values = self.decode_cursor(cursor) if cursor else ('next', None)
+        backwards = direction == 'previous'
+
+        queryset = self.queryset.order_by(*self._order_by(reverse=backwards))
+        if values is not None:
+            queryset = queryset.filter(self._after(values, reverse=backwards))
+
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if backwards:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, values is not None
+
+        return KeysetPage(
+            rows,
+            next_cursor=self.encode_cursor('next', rows[-1]) if rows and has_next else None,
+            previous_cursor=self.encode_cursor('previous', rows[0]) if rows and has_previous else None,
+            has_previous=has_previous,
+        )
+
+    def encode_cursor(self, direction, obj):
+        """Build an opaque cursor pointing before/after `obj`"""
+        # Rows of a .values() queryset are dicts
+        values = [
+            self._dump(obj[name] if isinstance(obj, dict) else getattr(obj, name))
+            for name, _ in self.ordering
+        ]
+        payload = json.dumps([direction, values], separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """Inverse of encode_cursor; raises InvalidCursor on anything malformed"""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            direction, values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        except (ValueError, TypeError, binascii.Error):
+            raise InvalidCursor(cursor)
+
+        if direction not in ('next', 'previous') or not isinstance(values, list) \
+                or len(values) != len(self.ordering):
+            raise InvalidCursor(cursor)
+
+        return direction, [
+            self._load(name, value) for (name, _), value in zip(self.ordering, values)
+        ]
+
+    def _order_by(self, reverse=False):
+        return [
+            ('-' if descending != reverse else '') + name
+            for name, descending in self.ordering
+        ]
+
+    def _after(self, values, reverse=False):
+        """Rows strictly after `values` in (possibly reversed) ordering"""
+        condition = Q()
+        equal = Q()
+        for (name, descending), value in zip(self.ordering, values):
+            lookup = 'lt' if descending != reverse else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    @staticmethod
+    def _dump(value):
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        if isinstance(value, (int, float, str)) or value is None:
+            return value
+        return str(value)
+
+    def _load(self, name, value):
+        # Cursors only ever hold non-null, finite JSON scalars
+        if value is None or not isinstance(value, (int, float, str)) \
+                or isinstance(value, float) and not math.isfinite(value):
+            raise InvalidCursor(name)
+        try:
+            field = self.queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            # Annotations (e.g. search rank) are plain JSON numbers
+            if not isinstance(value, (int, float)):
+                raise InvalidCursor(name)
+            return value
+        try:
+            return field.to_python(value)
+        except (ValidationError, TypeError, ValueError):
+            raise InvalidCursor(name)
@@ -0,0 +1,97 @@
+import re
+from django.db import connection, transaction
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'products_product_fts'
+
+# bm25() column weights, in FTS column order: name, description, category
+RANK_WEIGHTS = (10.0, 1.0, 5.0)
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+class ProductSearchIndex:
+    """SQLite FTS5 index over product name, description and category.
+
+    The index stores one row per active product, keyed by the product id
+    (the FTS rowid). It is kept in sync by ProductService; any other code
+    that writes these columns in bulk should call index_products() or
+    rebuild() afterwards.
+    """
+
+    @staticmethod
+    def is_available():
+        """FTS5 is only used on SQLite; other backends fall back to icontains"""
+        return connection.vendor == 'sqlite'
+
+    @staticmethod
+    def build_match_expression(query):
+        """Turn free text into an FTS5 query: every term must match, as a prefix"""
+        terms = TOKEN_RE.findall(query or '')
+        return ' '.join('"%s"*' % term for term in terms)
+
+    @staticmethod
+    def match_ids(expression):
+        """Subquery selecting the ids of products matching an FTS expression"""
+        return RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            [expression]
+        )
+
+    @staticmethod
+    def rank(expression):
+        """Per-row relevance (bm25, lower is better) for an FTS expression"""
+        weights = ', '.join(str(w) for w in RANK_WEIGHTS)
+        return RawSQL(
+            f'SELECT bm25({FTS_TABLE}, {weights}) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid = products_product.id',
+            [expression]
+        )
+
+    @staticmethod
+    def index_product(product):
+        """Add, refresh or drop a single product depending on is_active"""
+        ProductSearchIndex.index_products([product])
+
+    @staticmethod
+    def index_products(products):
+        """Add, refresh or drop a batch of products depending on is_active"""
+        if not ProductSearchIndex.is_available():
+            return
+        products = list(products)
+        if not products:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                [(p.id,) for p in products]
+            )
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, name, description, category) '
+                f'VALUES (%s, %s, %s, %s)',
+                [(p.id, p.name, p.description, p.category) for p in products if p.is_active]
+            )
+
+    @staticmethod
+    def remove_product(product_id):
+        """Drop a product from the index"""
+        if not ProductSearchIndex.is_available():
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [product_id])
+
+    @staticmethod
+    def rebuild():
+        """Re-create the index contents from the products table"""
+        if not ProductSearchIndex.is_available():
+            return 0
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, name, description, category) '
+                f'SELECT id, name, description, category FROM products_product '
+                f'WHERE is_active'
+            )
+            cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+            cursor.execute(f'SELECT COUNT(*) FROM {FTS_TABLE}')
+            return cursor.fetchone()[0]
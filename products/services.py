@@ -1,7 +1,29 @@
-from django.db.models import Q
-from .models import Product
+from datetime import timedelta
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .cache import ProductCache
+from .facets import CategoryFacets
+from .images import ProductImages
+from .models import Product, StockReservation
+from .pagination import KeysetPaginator, InvalidCursor
+from .search import ProductSearchIndex
+from shop_admin.services import StatsService
+
+# Products per conditional stock UPDATE; keeps statements under SQLite's parameter limit
+STOCK_UPDATE_CHUNK_SIZE = 200
 
 class ProductService:
+    # Keyset orderings; both end in the primary key so positions are unique
+    CATALOG_ORDERING = ['-created_at', '-id']
+    SEARCH_ORDERING = ['rank', '-created_at', '-id']
+    # Columns the shop_admin product grid may edit in bulk
+    BULK_EDIT_FIELDS = ('price', 'stock')
+
     @staticmethod
     def get_all_products(is_active=True):
         """Get all active products"""
@@ -9,18 +31,31 @@ class ProductService:
 
     @staticmethod
     def get_product_by_id(product_id):
-        """Get product by ID"""
-        try:
-            return Product.objects.get(id=product_id, is_active=True)
-        except Product.DoesNotExist:
-            return None
+        """Get product by ID (served from the product cache when possible)"""
+        def load():
+            try:
+                return Product.objects.get(id=product_id, is_active=True)
+            except Product.DoesNotExist:
+                return None
+        return ProductCache.get(product_id, load)
 
     @staticmethod
     def search_products(query):
-        """Search products by name, description, or category"""
+        """Search products by name, description, or category, best match first"""
         if not query:
             return Product.objects.filter(is_active=True)
-        
+
+        if ProductSearchIndex.is_available():
+            expression = ProductSearchIndex.build_match_expression(query)
+            if not expression:
+                return Product.objects.none()
+            return Product.objects.filter(
+                id__in=ProductSearchIndex.match_ids(expression),
+                is_active=True
+            ).annotate(
+                rank=ProductSearchIndex.rank(expression)
+            ).order_by('rank', '-created_at', '-id')
+
         return Product.objects.filter(
             Q(name__icontains=query) | 
             Q(description__icontains=query) | 
@@ -28,60 +63,442 @@ class ProductService:
             is_active=True
         )
 
+    @staticmethod
+    def get_products_page(query='', cursor=None, per_page=24, category=None, price_bucket=None):
+        """Get one keyset-paginated page of the catalog or of search results,
+        optionally narrowed to a category and a price facet bucket"""
+        products, ordering = ProductService._catalog(query, category)
+        if price_bucket is not None:
+            price_range = CategoryFacets.price_range(price_bucket)
+            if price_range is not None:
+                products = products.filter(price_range)
+
+        paginator = KeysetPaginator(products, ordering, per_page)
+        try:
+            return paginator.get_page(cursor)
+        except InvalidCursor:
+            return paginator.get_page()
+
+    @staticmethod
+    def get_catalog_rows(columns, query='', category=None, min_price=None, max_price=None,
+                         cursor=None, per_page=100):
+        """One keyset page of the catalog as dicts of `columns` (plus the ordering
+        keys), fetched with .values() so no model instances are built.
+
+        Unlike get_products_page, a bad cursor raises InvalidCursor.
+        """
+        products, ordering = ProductService._catalog(query, category)
+        if min_price is not None:
+            products = products.filter(price__gte=min_price)
+        if max_price is not None:
+            products = products.filter(price__lte=max_price)
+        keys = [name.lstrip('-') for name in ordering]
+        rows = products.values(*dict.fromkeys([*columns, *keys]))
+        return KeysetPaginator(rows, ordering, per_page).get_page(cursor)
+
+    @staticmethod
+    def _catalog(query, category):
+        """Active products matching the search and category, with their keyset ordering"""
+        if query:
+            products = ProductService.search_products(query)
+        else:
+            products = ProductService.get_all_products()
+        if category:
+            products = products.filter(category=category)
+
+        ranked = bool(query) and ProductSearchIndex.is_available() \
+            and bool(ProductSearchIndex.build_match_expression(query))
+        return products, ProductService.SEARCH_ORDERING if ranked else ProductService.CATALOG_ORDERING
+
     @staticmethod
     def create_product(name, description, price, stock, category, image=None):
-        """Create a new product"""
-        product = Product.objects.create(
-            name=name,
-            description=description,
-            price=price,
-            stock=stock,
-            category=category,
-            image=image
-        )
+        """Create a new product, with renditions of its image if one is uploaded"""
+        # Images are resized before the transaction so they never hold the write lock
+        renditions = ProductImages.generate(image) if image else {}
+        with transaction.atomic():
+            product = Product.objects.create(
+                name=name,
+                description=description,
+                price=price,
+                stock=stock,
+                category=category,
+                image=image,
+                renditions=renditions
+            )
+            ProductSearchIndex.index_product(product)
+            StatsService.increment(products=1, active_products=1)
+            CategoryFacets.move([(None, CategoryFacets.key(product.category, product.price, True))])
+            ProductCache.invalidate_on_commit([product.id])
         return product
 
     @staticmethod
     def update_product(product_id, **kwargs):
-        """Update product details"""
-        try:
-            product = Product.objects.get(id=product_id)
+        """Update product details; a new image replaces the renditions too"""
+        if 'image' in kwargs:
+            kwargs['renditions'] = ProductImages.generate(kwargs['image']) if kwargs['image'] else {}
+        with transaction.atomic():
+            try:
+                product = Product.objects.select_for_update().get(id=product_id)
+            except Product.DoesNotExist:
+                return None
+            was_active = product.is_active
+            facet = CategoryFacets.key(product.category, product.price, product.is_active)
             for key, value in kwargs.items():
                 setattr(product, key, value)
             product.save()
-            return product
-        except Product.DoesNotExist:
-            return None
+            ProductSearchIndex.index_product(product)
+            if product.is_active != was_active:
+                StatsService.increment(active_products=1 if product.is_active else -1)
+            CategoryFacets.move([(facet, CategoryFacets.key(product.category, product.price, product.is_active))])
+            ProductCache.invalidate_on_commit([product.id])
+        return product
 
     @staticmethod
+    @transaction.atomic
     def delete_product(product_id):
         """Soft delete product (set is_active to False)"""
         try:
-            product = Product.objects.get(id=product_id)
+            product = Product.objects.select_for_update().get(id=product_id)
+            was_active = product.is_active
+            facet = CategoryFacets.key(product.category, product.price, product.is_active)
             product.is_active = False
             product.save()
+            ProductSearchIndex.remove_product(product.id)
+            if was_active:
+                StatsService.increment(active_products=-1)
+            CategoryFacets.move([(facet, None)])
+            ProductCache.invalidate_on_commit([product.id])
             return True
         except Product.DoesNotExist:
             return False
 
+    @staticmethod
+    @transaction.atomic
+    def bulk_edit_products(rows):
+        """Apply grid edits: rows of {'id', 'updated_at', 'price' and/or 'stock'}.
+
+        updated_at is the version the editor loaded; products changed since
+        (including by checkouts) are returned as conflicts and left alone.
+        The rest are written with one prepared UPDATE per combination of
+        edited fields, so only those columns are touched. Price and stock
+        are not part of the search index or the dashboard counters, so only
+        the price facet counts and the product cache are refreshed.
+        Returns (updated, conflicts, errors): updated maps id to the new
+        updated_at, errors maps id to a message.
+        """
+        errors = {}
+        edits = {}
+        for row in rows:
+            try:
+                product_id = int(row['id'])
+            except (KeyError, TypeError, ValueError):
+                continue
+            changes = {}
+            try:
+                for name in ProductService.BULK_EDIT_FIELDS:
+                    if row.get(name) is not None:
+                        changes[name] = Product._meta.get_field(name).clean(row[name], None)
+            except ValidationError as error:
+                errors[product_id] = f"{name}: {' '.join(error.messages)}"
+                continue
+            version = parse_datetime(str(row.get('updated_at', '')))
+            if version is None or timezone.is_naive(version):
+                errors[product_id] = 'Missing or invalid updated_at'
+            elif changes:
+                edits[product_id] = (version, changes)
+
+        ids = sorted(edits)
+        current = {}
+        for start in range(0, len(ids), STOCK_UPDATE_CHUNK_SIZE):
+            current.update(
+                (product_id, row) for product_id, *row in
+                Product.objects.select_for_update()
+                .filter(id__in=ids[start:start + STOCK_UPDATE_CHUNK_SIZE])
+                .values_list('id', 'updated_at', 'category', 'price', 'is_active')
+            )
+
+        now = timezone.now()
+        conflicts = []
+        by_fields = {}
+        for product_id in ids:
+            version, changes = edits[product_id]
+            if product_id not in current:
+                errors[product_id] = 'Product not found'
+            elif current[product_id][0] != version:
+                conflicts.append(product_id)
+            else:
+                by_fields.setdefault(tuple(sorted(changes)), []).append((product_id, version, changes))
+
+        written = sum(
+            ProductService._write_edits(fields, edited, now) for fields, edited in by_fields.items()
+        )
+        updated = {product_id: now for edited in by_fields.values() for product_id, _, _ in edited}
+        if written != len(updated):
+            # Only possible if the rows changed after select_for_update read them
+            transaction.set_rollback(True)
+            return {}, sorted(conflicts + list(updated)), errors
+
+        facets = []
+        for edited in by_fields.values():
+            for product_id, _, changes in edited:
+                _, category, price, is_active = current[product_id]
+                facets.append((CategoryFacets.key(category, price, is_active),
+                               CategoryFacets.key(category, changes.get('price', price), is_active)))
+        CategoryFacets.move(facets)
+        ProductCache.invalidate_on_commit(updated)
+        return updated, conflicts, errors
+
+    @staticmethod
+    def _write_edits(fields, edited, now):
+        """One UPDATE of `fields` plus updated_at, run for every (id, version, changes) row.
+
+        QuerySet.bulk_update builds a CASE branch per row and field in Python,
+        which takes seconds for 10k rows; a prepared statement executed with
+        executemany() does the same work in milliseconds. The WHERE clause
+        re-checks the version, so the row count reveals any lost update.
+        """
+        db = transaction.get_connection()
+        quote = db.ops.quote_name
+        meta = Product._meta
+        edited_fields = [meta.get_field(name) for name in fields]
+        updated_at = meta.get_field('updated_at')
+        sql = 'UPDATE {} SET {}, {} = %s WHERE {} = %s AND {} = %s'.format(
+            quote(meta.db_table),
+            ', '.join(f'{quote(field.column)} = %s' for field in edited_fields),
+            quote(updated_at.column),
+            quote(meta.pk.column),
+            quote(updated_at.column),
+        )
+        now = updated_at.get_db_prep_save(now, db)
+        params = [
+            [field.get_db_prep_save(changes[field.name], db) for field in edited_fields]
+            + [now, product_id, updated_at.get_db_prep_save(version, db)]
+            for product_id, version, changes in edited
+        ]
+        with db.cursor() as cursor:
+            cursor.executemany(sql, params)
+            return cursor.rowcount
+
     @staticmethod
     def check_stock(product_id, quantity):
-        """Check if product has sufficient stock"""
-        try:
-            product = Product.objects.get(id=product_id)
-            return product.stock >= quantity
-        except Product.DoesNotExist:
-            return False
+        """Check if product has sufficient stock not held by reservations"""
+        return Product.objects.filter(
+            id=product_id,
+            stock__gte=F('reserved') + quantity
+        ).exists()
 
     @staticmethod
     def reduce_stock(product_id, quantity):
-        """Reduce product stock"""
-        try:
-            product = Product.objects.get(id=product_id)
-            if product.stock >= quantity:
-                product.stock -= quantity
-                product.save()
-                return True
-            return False
-        except Product.DoesNotExist:
-            return False
+        """Reduce product stock atomically; False if there is not enough left.
+
+        A single conditional UPDATE, so concurrent callers can never take the
+        stock below zero (or below what carts have reserved) and no other
+        column is rewritten.
+        """
+        updated = Product.objects.filter(
+            id=product_id,
+            stock__gte=F('reserved') + quantity
+        ).update(
+            stock=F('stock') - quantity,
+            updated_at=timezone.now()
+        )
+        if updated:
+            ProductCache.invalidate_on_commit([product_id])
+        return updated == 1
+
+    @staticmethod
+    @transaction.atomic
+    def reduce_stock_bulk(quantities, held=None):
+        """Reduce stock for several products, all or nothing.
+
+        `quantities` maps product id to the quantity to take. `held` optionally
+        maps product id to units the caller already holds as reservations;
+        those are converted (released from Product.reserved) rather than
+        competing with other carts' reservations.
+
+        Each chunk of products is decremented by one conditional UPDATE using a
+        CASE on the id, so the number of queries does not grow with the cart.
+        Returns (True, None) on success or (False, product_id) for a product
+        without enough stock, in which case every decrement is rolled back.
+        """
+        held = held or {}
+        now = timezone.now()
+        items = sorted(quantities.items())
+        for start in range(0, len(items), STOCK_UPDATE_CHUNK_SIZE):
+            chunk = dict(items[start:start + STOCK_UPDATE_CHUNK_SIZE])
+            wanted = ProductService._quantity_case(chunk)
+            changes = {'stock': F('stock') - wanted, 'updated_at': now}
+            reserved_after = F('reserved')
+            chunk_held = {pid: held[pid] for pid in chunk if held.get(pid)}
+            if chunk_held:
+                # Clamped like _release: a hold the sweeper already released
+                # must not drive reserved below zero
+                reserved_after = Greatest(F('reserved') - ProductService._quantity_case(chunk_held), Value(0))
+                changes['reserved'] = reserved_after
+
+            updated = Product.objects.filter(id__in=chunk, stock__gte=reserved_after + wanted).update(**changes)
+            if updated != len(chunk):
+                # Rows this UPDATE touched carry its exact timestamp
+                touched = set(
+                    Product.objects.filter(id__in=chunk, updated_at=now).values_list('id', flat=True)
+                )
+                transaction.set_rollback(True)
+                return False, next(product_id for product_id in chunk if product_id not in touched)
+        ProductCache.invalidate_on_commit(quantities)
+        return True, None
+
+    @staticmethod
+    def restore_stock_bulk(quantities):
+        """Add quantities back to several products' stock.
+
+        `quantities` maps product id to the quantity to return; one UPDATE
+        per chunk of products regardless of how many there are.
+        """
+        now = timezone.now()
+        items = sorted(quantities.items())
+        for start in range(0, len(items), STOCK_UPDATE_CHUNK_SIZE):
+            chunk = dict(items[start:start + STOCK_UPDATE_CHUNK_SIZE])
+            Product.objects.filter(id__in=chunk).update(
+                stock=F('stock') + ProductService._quantity_case(chunk),
+                updated_at=now
+            )
+        ProductCache.invalidate_on_commit(quantities)
+
+    @staticmethod
+    def _quantity_case(quantities):
+        """CASE expression mapping each product id to its quantity (0 otherwise)"""
+        return Case(
+            *[When(id=product_id, then=Value(quantity)) for product_id, quantity in quantities.items()],
+            default=Value(0),
+            output_field=IntegerField()
+        )
+
+    @staticmethod
+    def restore_stock(product_id, quantity):
+        """Put quantity back into stock (e.g. after a cancellation)"""
+        updated = Product.objects.filter(id=product_id).update(
+            stock=F('stock') + quantity,
+            updated_at=timezone.now()
+        )
+        if updated:
+            ProductCache.invalidate_on_commit([product_id])
+        return updated == 1
+
+
+class ReservationService:
+    """Time-limited holds on stock for items sitting in carts.
+
+    Reserving moves units into Product.reserved with a conditional UPDATE,
+    so a cart only gets what is genuinely available. Checkout converts the
+    holds into real stock decrements; abandoned holds expire after
+    CART_RESERVATION_TTL seconds and are returned by sweep_expired().
+    """
+
+    @staticmethod
+    def get_expiry():
+        return timezone.now() + timedelta(seconds=settings.CART_RESERVATION_TTL)
+
+    @staticmethod
+    @transaction.atomic
+    def reserve(user, product_id, quantity):
+        """Hold `quantity` units of a product for the user (replacing any previous hold).
+
+        Returns True if the units are held, False if there is not enough
+        unreserved stock; the previous hold is kept unchanged in that case.
+        """
+        reservation = StockReservation.objects.filter(user=user, product_id=product_id).first()
+        delta = quantity - (reservation.quantity if reservation else 0)
+
+        if delta > 0 and not ReservationService._hold(product_id, delta):
+            # Expired holds still count until swept; free them and try again
+            ReservationService.sweep_expired(product_ids=[product_id], exclude_user=user)
+            if not ReservationService._hold(product_id, delta):
+                return False
+        elif delta < 0:
+            ReservationService._release({product_id: -delta})
+
+        if reservation:
+            reservation.quantity = quantity
+            reservation.expires_at = ReservationService.get_expiry()
+            reservation.save(update_fields=['quantity', 'expires_at'])
+        else:
+            StockReservation.objects.create(
+                user=user,
+                product_id=product_id,
+                quantity=quantity,
+                expires_at=ReservationService.get_expiry()
+            )
+        return True
+
+    @staticmethod
+    @transaction.atomic
+    def release(user, product_id):
+        """Drop the user's hold on a product, if any"""
+        reservation = StockReservation.objects.filter(user=user, product_id=product_id).first()
+        if reservation:
+            reservation.delete()
+            ReservationService._release({product_id: reservation.quantity})
+
+    @staticmethod
+    def get_held_quantities(user, product_ids):
+        """Units the user currently holds per product (expired holds included until swept)"""
+        return dict(
+            StockReservation.objects.filter(user=user, product_id__in=product_ids)
+            .values_list('product_id', 'quantity')
+        )
+
+    @staticmethod
+    @transaction.atomic
+    def convert(user, quantities, held):
+        """Turn the user's holds into stock decrements for a checkout.
+
+        `quantities` maps product id to the quantity bought and `held` is the
+        result of get_held_quantities(). Returns the same (ok, product_id)
+        pair as ProductService.reduce_stock_bulk.
+        """
+        reduced, failed_product_id = ProductService.reduce_stock_bulk(quantities, held=held)
+        if reduced and held:
+            StockReservation.objects.filter(user=user, product_id__in=held).delete()
+        return reduced, failed_product_id
+
+    @staticmethod
+    @transaction.atomic
+    def sweep_expired(product_ids=None, exclude_user=None, batch_size=1000):
+        """Release expired holds in bulk; returns the number of reservations removed"""
+        expired = StockReservation.objects.filter(expires_at__lte=timezone.now())
+        if product_ids is not None:
+            expired = expired.filter(product_id__in=product_ids)
+        if exclude_user is not None:
+            expired = expired.exclude(user=exclude_user)
+
+        removed = 0
+        while True:
+            batch = list(expired.values_list('id', 'product_id', 'quantity')[:batch_size])
+            if not batch:
+                return removed
+            released = {}
+            for _, product_id, quantity in batch:
+                released[product_id] = released.get(product_id, 0) + quantity
+            StockReservation.objects.filter(id__in=[row[0] for row in batch]).delete()
+            ReservationService._release(released)
+            removed += len(batch)
+
+    @staticmethod
+    def _hold(product_id, quantity):
+        held = Product.objects.filter(
+            id=product_id,
+            stock__gte=F('reserved') + quantity
+        ).update(reserved=F('reserved') + quantity) == 1
+        if held:
+            ProductCache.invalidate_on_commit([product_id])
+        return held
+
+    @staticmethod
+    def _release(quantities):
+        items = sorted(quantities.items())
+        for start in range(0, len(items), STOCK_UPDATE_CHUNK_SIZE):
+            chunk = dict(items[start:start + STOCK_UPDATE_CHUNK_SIZE])
+            Product.objects.filter(id__in=chunk).update(
+                reserved=Greatest(F('reserved') - ProductService._quantity_case(chunk), Value(0))
+            )
+        ProductCache.invalidate_on_commit(quantities)
@@ -0,0 +1,52 @@
+from django import template
+from django.conf import settings
+from django.core.cache import caches
+from django.urls import reverse
+from django.utils.safestring import mark_safe
+
+register = template.Library()
+
+CARD_TEMPLATE = 'products/_product_card.html'
+# Rendered in place of {{ actions }}; product fields are escaped, so this
+# comment can only come from the template
+ACTIONS_SLOT = '<!-- product-card-actions -->'
+
+
+def card_key(product):
+    # available_stock is part of the key because reservations change it
+    # without touching updated_at
+    return f'product_card:{product.id}:{product.updated_at.timestamp()}:{product.available_stock}'
+
+
+@register.simple_tag(takes_context=True)
+def product_cards(context, products):
+    """(card head, card tail, add-to-cart URL) for each product, from the fragment cache.
+
+    Cards are rendered from products/_product_card.html with a context
+    holding only the product, so no user, CSRF token or message can end up
+    in a cached fragment. The rendered card is split at its {{ actions }}
+    slot; the page puts the per-user form between the two halves. All cards
+    of a page are read with one get_many() and the misses stored with one
+    set_many(). settings.PRODUCT_CARD_CACHE_TIMEOUT = 0 disables caching.
+    """
+    timeout = settings.PRODUCT_CARD_CACHE_TIMEOUT
+    cache = caches[settings.FRAGMENT_CACHE_ALIAS]
+    keys = [card_key(product) for product in products]
+    cached = cache.get_many(keys) if timeout else {}
+
+    card_template = context.template.engine.get_template(CARD_TEMPLATE)
+    rendered = {}
+    cards = []
+    for product, key in zip(products, keys):
+        card = cached.get(key)
+        if card is None:
+            html = card_template.render(template.Context(
+                {'product': product, 'actions': mark_safe(ACTIONS_SLOT)}, autoescape=context.autoescape
+            ))
+            head, tail = html.split(ACTIONS_SLOT)
+            card = (head, tail, reverse('add_to_cart', args=[product.id]))
+            rendered[key] = card
+        cards.append((mark_safe(card[0]), mark_safe(card[1]), card[2]))
+    if rendered and timeout:
+        cache.set_many(rendered, timeout)
+    return cards
@@ -0,0 +1,34 @@
+from django import template
+from django.core.files.storage import default_storage
+
+register = template.Library()
+
+
+@register.inclusion_tag('products/_picture.html')
+def product_picture(product, size, css_class=''):
+    """<picture> for one rendition of a product image: WebP with a JPEG fallback.
+
+    Products without renditions (not backfilled yet) fall back to the
+    original upload.
+    """
+    rendition = product.renditions.get(size)
+    context = {'alt': product.name, 'css_class': css_class}
+    if rendition:
+        context.update({
+            'webp': default_storage.url(rendition['webp']),
+            'jpg': default_storage.url(rendition['jpg']),
+            'width': rendition['width'],
+            'height': rendition['height'],
+        })
+    elif product.image:
+        context['jpg'] = product.image.url
+    return context
+
+
+@register.simple_tag
+def product_image_url(product, size, ext='jpg'):
+    """URL of one rendition file, falling back to the original upload (or '')"""
+    rendition = product.renditions.get(size)
+    if rendition:
+        return default_storage.url(rendition[ext])
+    return product.image.url if product.image else ''
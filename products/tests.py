@@ -1,3 +1,375 @@
-from django.test import TestCase
+import base64
+import io
+import json
+import re
+import shutil
+import tempfile
+import unittest
+from decimal import Decimal
+from unittest import mock
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from main.testing import IsolatedCacheTestCase
+from .facets import CategoryFacets
+from .importer import CatalogImporter
+from .models import CategoryFacet, Product
+from .pagination import InvalidCursor, KeysetPaginator
+from .search import ProductSearchIndex
+from .services import ProductService
 
-# Create your tests here.
+
+def full_scans(queries):
+    """Plan steps of the SELECT/UPDATE/DELETE queries that scan a whole table or index.
+
+    Without ANALYZE statistics SQLite plans as if tables were large, so tiny
+    fixtures still give the real plans.
+    """
+    scans = []
+    with connection.cursor() as cursor:
+        for query in queries:
+            sql = query['sql']
+            if not sql.startswith(('SELECT', 'UPDATE', 'DELETE')):
+                continue
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            for row in cursor.fetchall():
+                detail = row[-1]
+                if not detail.startswith('SCAN ') or 'VIRTUAL TABLE' in detail \
+                        or detail == 'SCAN CONSTANT ROW':
+                    continue
+                # "SCAN t USING INDEX i" walks the whole index; that is only
+                # bounded when it supplies the ORDER BY of a LIMITed query
+                if 'INDEX' in detail and ' LIMIT ' in sql:
+                    continue
+                scans.append(f'{detail}\n    in: {sql}')
+    return scans
+
+
+class CatalogImporterTests(IsolatedCacheTestCase):
+    def test_upserts_on_sku_and_reports_bad_rows(self):
+        Product.objects.create(sku='A-1', name='Old name', description='', price=1, stock=1,
+                               category='Old', is_active=False)
+        feed = io.StringIO(
+            'sku,name,price,stock,category\n'
+            'A-1,New name,2.50,7,Books\n'
+            'B-2,Brand new,3.10,4,Books\n'
+            'C-3,Bad price,abc,4,Books\n'
+        )
+
+        result = CatalogImporter(batch_size=1).run(feed, 'csv')
+
+        self.assertEqual((result.rows, result.created, result.updated, result.error_count), (3, 1, 1, 1))
+        self.assertEqual(result.errors[0][0], 4)
+        updated = Product.objects.get(sku='A-1')
+        self.assertEqual((updated.name, updated.price, updated.stock), ('New name', Decimal('2.50'), 7))
+        # No is_active column: the existing product keeps its flag, new ones are active
+        self.assertFalse(updated.is_active)
+        self.assertTrue(Product.objects.get(sku='B-2').is_active)
+
+
+class ReduceStockBulkTests(IsolatedCacheTestCase):
+    def test_rolls_back_every_decrement_when_one_product_is_short(self):
+        plenty = Product.objects.create(name='Plenty', description='', price=1, stock=10, category='Test')
+        scarce = Product.objects.create(name='Scarce', description='', price=1, stock=1, category='Test')
+
+        reduced, failed = ProductService.reduce_stock_bulk({plenty.id: 3, scarce.id: 2})
+
+        self.assertFalse(reduced)
+        self.assertEqual(failed, scarce.id)
+        plenty.refresh_from_db()
+        self.assertEqual(plenty.stock, 10)
+
+    def test_releasing_more_than_is_reserved_stops_at_zero(self):
+        product = Product.objects.create(name='Lamp', description='', price=1, stock=10, reserved=1,
+                                         category='Test')
+
+        reduced, _ = ProductService.reduce_stock_bulk({product.id: 3}, held={product.id: 3})
+
+        self.assertTrue(reduced)
+        product.refresh_from_db()
+        self.assertEqual((product.stock, product.reserved), (7, 0))
+
+
+class BulkEditProductsTests(IsolatedCacheTestCase):
+    def test_stale_rows_conflict_and_only_edited_columns_are_written(self):
+        fresh, stale = Product.objects.bulk_create([
+            Product(name=name, description='', price=5, stock=10, category='Test') for name in ('Fresh', 'Stale')
+        ])
+        versions = dict(Product.objects.values_list('id', 'updated_at'))
+        # A checkout sells one unit of `stale` after the grid was loaded
+        ProductService.reduce_stock(stale.id, 1)
+
+        updated, conflicts, errors = ProductService.bulk_edit_products([
+            {'id': fresh.id, 'updated_at': versions[fresh.id].isoformat(), 'stock': '25'},
+            {'id': stale.id, 'updated_at': versions[stale.id].isoformat(), 'stock': '25'},
+        ])
+
+        self.assertEqual((list(updated), conflicts, errors), ([fresh.id], [stale.id], {}))
+        self.assertEqual(
+            dict(Product.objects.values_list('id', 'stock')), {fresh.id: 25, stale.id: 9}
+        )
+        fresh.refresh_from_db()
+        self.assertEqual((fresh.price, fresh.updated_at), (5, updated[fresh.id]))
+
+
+class ProductSearchTests(IsolatedCacheTestCase):
+    def names(self, query):
+        return [product.name for product in ProductService.search_products(query)]
+
+    def test_name_matches_rank_above_description_matches(self):
+        ProductService.create_product('Desk', 'Comes with a lamp holder', Decimal('50'), 1, 'Home')
+        ProductService.create_product('Lamp', 'Bright', Decimal('20'), 1, 'Home')
+        ProductService.create_product('Chair', 'Wooden', Decimal('30'), 1, 'Home')
+
+        self.assertEqual(self.names('lamp'), ['Lamp', 'Desk'])
+        # Every term is a prefix and all of them must match
+        self.assertEqual(self.names('bri la'), ['Lamp'])
+        self.assertEqual(self.names('***'), [])
+
+    def test_index_follows_create_update_and_delete(self):
+        product = ProductService.create_product('Teapot', 'Porcelain', Decimal('15'), 1, 'Kitchen')
+        self.assertEqual(self.names('teapot'), ['Teapot'])
+
+        ProductService.update_product(product.id, name='Kettle')
+        self.assertEqual(self.names('teapot'), [])
+        self.assertEqual(self.names('kettle'), ['Kettle'])
+
+        ProductService.delete_product(product.id)
+        self.assertEqual(self.names('kettle'), [])
+        ProductService.update_product(product.id, is_active=True)
+        self.assertEqual(self.names('kettle'), ['Kettle'])
+
+    def test_falls_back_to_icontains_without_fts(self):
+        ProductService.create_product('Lamp', 'Bright', Decimal('20'), 1, 'Home')
+        ProductService.create_product('Desk', 'Oak', Decimal('50'), 1, 'Furniture')
+
+        with mock.patch.object(ProductSearchIndex, 'is_available', return_value=False):
+            self.assertEqual(self.names('amp'), ['Lamp'])
+            self.assertEqual(self.names('furni'), ['Desk'])
+            page = ProductService.get_products_page('amp')
+        self.assertEqual([product.name for product in page], ['Lamp'])
+
+
+class KeysetPaginatorTests(IsolatedCacheTestCase):
+    def setUp(self):
+        super().setUp()
+        Product.objects.bulk_create([
+            Product(name=f'Item {i}', description='', price=1, stock=1, category='Test') for i in range(5)
+        ])
+        self.paginator = KeysetPaginator(Product.objects.all(), ['name', 'id'], 2)
+
+    def names(self, page):
+        return [product.name for product in page]
+
+    def test_forward_and_back_round_trip(self):
+        first = self.paginator.get_page()
+        self.assertEqual(self.names(first), ['Item 0', 'Item 1'])
+        self.assertFalse(first.has_previous())
+        self.assertIsNone(first.previous_cursor)
+
+        second = self.paginator.get_page(first.next_cursor)
+        third = self.paginator.get_page(second.next_cursor)
+        self.assertEqual(self.names(third), ['Item 4'])
+        self.assertFalse(third.has_next())
+
+        back = self.paginator.get_page(third.previous_cursor)
+        self.assertEqual(self.names(back), self.names(second))
+        # Going back to the first page finds no earlier rows
+        start = self.paginator.get_page(back.previous_cursor)
+        self.assertEqual(self.names(start), ['Item 0', 'Item 1'])
+        self.assertFalse(start.has_previous())
+        self.assertIsNone(start.previous_cursor)
+
+    def test_malformed_cursors_are_invalid(self):
+        def encode(payload):
+            return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+        for cursor in ('not-base64!', encode(['next', [None, None]]), encode(['next', [[1], [1]]]),
+                       encode(['next', ['Item 1', 'abc']]), encode(['sideways', ['Item 1', 1]])):
+            with self.subTest(cursor=cursor), self.assertRaises(InvalidCursor):
+                self.paginator.get_page(cursor)
+
+        bad = encode(['next', [[1], [1]]])
+        self.assertEqual(self.client.get(f'/api/products/?cursor={bad}').status_code, 400)
+        # The storefront falls back to the first page
+        self.assertEqual(self.client.get(f'/?cursor={bad}').status_code, 200)
+
+
+class ProductCacheTests(IsolatedCacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.product = ProductService.create_product('Novel', '', Decimal('12'), 5, 'Books')
+        self.assertEqual(ProductService.get_product_by_id(self.product.id).price, Decimal('12'))
+
+    def test_committed_write_invalidates_the_cached_product(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductService.update_product(self.product.id, price=Decimal('15'))
+
+        self.assertEqual(ProductService.get_product_by_id(self.product.id).price, Decimal('15'))
+
+    def test_admin_list_editable_saves_go_through_the_service(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'secret'))
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/django-admin/products/product/', {
+                'form-TOTAL_FORMS': '1', 'form-INITIAL_FORMS': '1',
+                'form-0-id': self.product.id, 'form-0-price': '600', 'form-0-stock': '5',
+                'form-0-is_active': 'on', '_save': 'Save',
+            })
+        self.assertEqual(response.status_code, 302)
+
+        self.assertEqual(ProductService.get_product_by_id(self.product.id).price, Decimal('600'))
+        self.assertEqual(
+            set(CategoryFacet.objects.filter(products__gt=0).values_list('category', 'bucket')), {('Books', 5)}
+        )
+
+
+class CategoryFacetTests(IsolatedCacheTestCase):
+    def counts(self):
+        return set(CategoryFacet.objects.filter(products__gt=0).values_list('category', 'bucket', 'products'))
+
+    def test_counts_follow_product_writes(self):
+        book = ProductService.create_product('Novel', '', Decimal('12'), 5, 'Books')
+        lamp = ProductService.create_product('Lamp', '', Decimal('80'), 5, 'Home')
+        ProductService.update_product(book.id, category='Home')
+        ProductService.delete_product(lamp.id)
+        ProductService.bulk_edit_products([
+            {'id': book.id, 'updated_at': Product.objects.get(id=book.id).updated_at.isoformat(), 'price': '30'}
+        ])
+        CatalogImporter().run(io.StringIO('sku,name,price,stock,category\nS-1,Atlas,600,1,Books\n'), 'csv')
+
+        maintained = self.counts()
+        self.assertEqual(maintained, {('Home', 1, 1), ('Books', 5, 1)})
+        CategoryFacets.rebuild()
+        self.assertEqual(self.counts(), maintained)
+
+        facets = CategoryFacets.get_facets(category='Books')
+        self.assertEqual(facets['categories'], [{'name': 'Books', 'count': 1}, {'name': 'Home', 'count': 1}])
+        self.assertEqual([price['label'] for price in facets['prices']], ['$500 to $1000'])
+
+
+class ProductImageTests(IsolatedCacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+
+    def test_upload_gets_upright_metadata_free_renditions(self):
+        exif = Image.Exif()
+        exif[0x0112] = 6  # rotate 90 degrees for display
+        upload = io.BytesIO()
+        Image.new('RGB', (2000, 1000), 'red').save(upload, 'JPEG', exif=exif, icc_profile=b'\0' * 128)
+
+        with override_settings(MEDIA_ROOT=self.media_root):
+            product = ProductService.create_product(
+                'Camera', '', Decimal('10'), 1, 'Electronics',
+                image=SimpleUploadedFile('camera.jpg', upload.getvalue())
+            )
+
+            card = product.renditions['card']
+            self.assertEqual((card['width'], card['height']), (200, 400))
+            for ext, image_format in (('webp', 'WEBP'), ('jpg', 'JPEG')):
+                with Image.open(f"{self.media_root}/{card[ext]}") as image:
+                    self.assertEqual((image.format, image.size), (image_format, (200, 400)))
+                    self.assertFalse(image.getexif())
+                    self.assertNotIn('icc_profile', image.info)
+
+
+class ConditionalGetTests(IsolatedCacheTestCase):
+    def test_unchanged_catalog_answers_304_before_rendering(self):
+        product = ProductService.create_product('Novel', '', Decimal('12'), 5, 'Books')
+        etag = self.client.get('/')['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductService.update_product(product.id, price=Decimal('15'))
+        self.assertEqual(self.client.get('/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_new_product_changes_the_catalog_etags(self):
+        ProductService.create_product('Novel', '', Decimal('12'), 5, 'Books')
+        etags = {url: self.client.get(url)['ETag'] for url in ('/', '/api/products/')}
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductService.create_product('Atlas', '', Decimal('30'), 5, 'Books')
+
+        for url, etag in etags.items():
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200, url)
+            self.assertContains(response, 'Atlas')
+
+
+class ProductCardCacheTests(IsolatedCacheTestCase):
+    def render_homepage(self):
+        html = self.client.get('/').content.decode()
+        # The CSRF token is masked differently on every request
+        return re.sub(r'name="csrfmiddlewaretoken" value="\w+"', '', html)
+
+    def test_warm_and_cold_cache_render_the_same_page(self):
+        for index in range(3):
+            ProductService.create_product(f'Book <{index}>', '', Decimal('10'), 2, 'Books')
+        shopper = User.objects.create_user('shopper', 'shopper@example.com', 'secret')
+
+        for user in (None, shopper):
+            with self.subTest(user=user):
+                if user:
+                    self.client.force_login(user)
+                caches[settings.FRAGMENT_CACHE_ALIAS].clear()
+                cold = self.render_homepage()
+                warm = self.render_homepage()
+                self.assertEqual(warm, cold)
+                self.assertEqual(cold.count('<div class="product-card">'), 3)
+                self.assertEqual(cold.count('Add to Cart'), 3 if user else 0)
+                self.assertIn('Book &lt;0&gt;', cold)
+
+
+class CatalogApiTests(IsolatedCacheTestCase):
+    def test_projection_filters_and_cursor(self):
+        for index in range(5):
+            ProductService.create_product(f'Book {index}', '', Decimal(10 + index), 2, 'Books')
+        ProductService.create_product('Lamp', '', Decimal('12'), 2, 'Home')
+
+        url = '/api/products/?fields=name,price&category=Books&min_price=11&limit=3'
+        with self.assertNumQueries(1):
+            first = self.client.get(url).json()
+        self.assertEqual(first['results'], [
+            {'name': 'Book 4', 'price': '14.00'},
+            {'name': 'Book 3', 'price': '13.00'},
+            {'name': 'Book 2', 'price': '12.00'},
+        ])
+        second = self.client.get(f"{url}&cursor={first['next']}").json()
+        self.assertEqual([row['name'] for row in second['results']], ['Book 1'])
+        self.assertIsNone(second['next'])
+
+        self.assertEqual(self.client.get('/api/products/?fields=secret').status_code, 400)
+        for value in ('nan', 'Infinity', 'abc'):
+            self.assertEqual(self.client.get(f'/api/products/?min_price={value}').status_code, 400)
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'Reads SQLite EXPLAIN QUERY PLAN output')
+class QueryPlanTests(IsolatedCacheTestCase):
+    """Every query ProductService issues must be driven by an index"""
+
+    def test_service_queries_use_indexes(self):
+        lamp, _, third = Product.objects.bulk_create([
+            Product(name=f'Lamp {i}', description='Desk lamp', price=10, stock=50, category='Home')
+            for i in range(3)
+        ])
+        with CaptureQueriesContext(connection) as captured:
+            list(ProductService.get_products_page(per_page=2))
+            list(ProductService.get_products_page('lamp', per_page=2))
+            list(ProductService.get_products_page(per_page=2, category='Home', price_bucket=1))
+            ProductService.get_product_by_id(lamp.id)
+            ProductService.check_stock(lamp.id, 1)
+            ProductService.reduce_stock(third.id, 1)
+            ProductService.restore_stock(third.id, 1)
+            ProductService.update_product(third.id, stock=40)
+
+        self.assertGreater(len(captured), 8)
+        self.assertEqual(full_scans(captured.captured_queries), [])
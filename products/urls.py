@@ -1,8 +1,10 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 urlpatterns = [
     path('', views.homepage, name='homepage'),
     path('product/<int:product_id>/', views.product_detail, name='product_detail'),
     path('add-to-cart/<int:product_id>/', views.add_to_cart_view, name='add_to_cart'),
+    path('api/products/', api.product_list, name='api_product_list'),
+    path('api/products/<int:product_id>/', api.product_detail, name='api_product_detail'),
 ]
@@ -1,24 +1,89 @@
+import hashlib
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse
+from django.conf import settings
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_cookie
+from .cache import ProductCache
+from .facets import CategoryFacets
 from .services import ProductService
 from users.services import CartService
 
+def _has_messages(request):
+    """Pending flash messages; such pages are always rendered, a 304 would drop them"""
+    return len(messages.get_messages(request)) > 0
+
+def _page_etag(request, *versions):
+    """ETag of a storefront page for this visitor, or None to always render it.
+
+    Besides the data versions it covers the URL and everything per-user the
+    page shows: the account (navigation, add-to-cart forms) and the CSRF
+    cookie the embedded form tokens are derived from.
+    """
+    if _has_messages(request):
+        return None
+    user = request.user
+    parts = (*versions, request.get_full_path(), user.pk, user.is_staff,
+             request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''))
+    return hashlib.blake2b('|'.join(map(str, parts)).encode(), digest_size=16).hexdigest()
+
+def _homepage_etag(request):
+    return _page_etag(request, ProductCache.catalog_version()[0])
+
+def _homepage_last_modified(request):
+    if _has_messages(request):
+        return None
+    return ProductCache.catalog_version()[1]
+
+def _product_etag(request, product_id):
+    product = ProductService.get_product_by_id(product_id)
+    if not product:
+        return None
+    return _page_etag(request, ProductCache.catalog_version()[0], product.id, product.updated_at.isoformat())
+
+def _product_last_modified(request, product_id):
+    product = ProductService.get_product_by_id(product_id)
+    if not product or _has_messages(request):
+        return None
+    return max(product.updated_at, ProductCache.catalog_version()[1])
+
+# Storefront pages: browsers keep them but revalidate on every visit, and
+# condition() checks the validators before any catalog query or rendering
+@cache_control(private=True, no_cache=True)
+@vary_on_cookie
+@condition(etag_func=_homepage_etag, last_modified_func=_homepage_last_modified)
 def homepage(request):
     """Homepage - view and search products"""
     query = request.GET.get('q', '')
-    if query:
-        products = ProductService.search_products(query)
-    else:
-        products = ProductService.get_all_products()
-    
+    category = request.GET.get('category', '').strip() or None
+    try:
+        price_bucket = int(request.GET['price'])
+    except (KeyError, ValueError):
+        price_bucket = None
+    page = ProductService.get_products_page(
+        query,
+        cursor=request.GET.get('cursor'),
+        per_page=settings.PRODUCTS_PER_PAGE,
+        category=category,
+        price_bucket=price_bucket
+    )
+
     context = {
-        'products': products,
-        'query': query
+        'products': page.object_list,
+        'page': page,
+        'query': query,
+        'category': category,
+        'price_bucket': price_bucket,
+        'facets': CategoryFacets.get_facets(category, price_bucket)
     }
     return render(request, 'products/homepage.html', context)
 
+@cache_control(private=True, no_cache=True)
+@vary_on_cookie
+@condition(etag_func=_product_etag, last_modified_func=_product_last_modified)
 def product_detail(request, product_id):
     """Product detail view"""
     product = ProductService.get_product_by_id(product_id)
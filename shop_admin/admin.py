@@ -1,3 +1,6 @@
 from django.contrib import admin
+from .models import DashboardStats
 
-# Register your models here.
+@admin.register(DashboardStats)
+class DashboardStatsAdmin(admin.ModelAdmin):
+    list_display = ['products', 'orders', 'users', 'orders_pending', 'revenue', 'reconciled_at', 'updated_at']
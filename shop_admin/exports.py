@@ -0,0 +1,100 @@
+import csv
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from products.pagination import KeysetPaginator
+from users.models import OrderItem
+
+ORDER_COLUMNS = [
+    'order_id', 'created_at', 'status', 'username', 'order_total', 'shipping_address',
+    'product_id', 'sku', 'product_name', 'quantity', 'price', 'line_total',
+]
+PRODUCT_COLUMNS = [
+    'id', 'sku', 'name', 'description', 'category', 'price', 'stock', 'reserved',
+    'is_active', 'created_at', 'updated_at',
+]
+# Spreadsheets run a cell starting with one of these as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+class _Echo:
+    """File-like object whose write() hands the line back to the caller"""
+
+    def write(self, value):
+        return value
+
+
+class ExportService:
+    """Streamed order and catalog exports.
+
+    Rows are read in keyset batches: every batch is a separate, fully
+    fetched query, so no cursor (and no SQLite read transaction) stays open
+    while a slow client downloads the file, and memory holds one batch at a
+    time however large the export is.
+    """
+
+    BATCH_SIZE = 2000
+    FORMATS = ('csv', 'jsonl')
+
+    @staticmethod
+    def order_rows(orders):
+        """One row per order item of the `orders` queryset, oldest order first"""
+        order_fields = ['id', 'created_at', 'status', 'user__username', 'total_amount', 'shipping_address']
+        for batch in ExportService._batches(orders.values(*order_fields), ['created_at', 'id']):
+            items = {}
+            for item in OrderItem.objects.filter(order_id__in=[order['id'] for order in batch]) \
+                    .order_by('order_id', 'id') \
+                    .values('order_id', 'product_id', 'product__sku', 'product__name', 'quantity', 'price'):
+                items.setdefault(item['order_id'], []).append(item)
+
+            for order in batch:
+                for item in items.get(order['id'], []):
+                    yield {
+                        'order_id': order['id'],
+                        'created_at': order['created_at'],
+                        'status': order['status'],
+                        'username': order['user__username'],
+                        'order_total': order['total_amount'],
+                        'shipping_address': order['shipping_address'],
+                        'product_id': item['product_id'],
+                        'sku': item['product__sku'],
+                        'product_name': item['product__name'],
+                        'quantity': item['quantity'],
+                        'price': item['price'],
+                        'line_total': item['price'] * item['quantity'],
+                    }
+
+    @staticmethod
+    def product_rows(products):
+        """One row per product of the `products` queryset, in id order"""
+        for batch in ExportService._batches(products.values(*PRODUCT_COLUMNS), ['id']):
+            yield from batch
+
+    @staticmethod
+    def render(rows, columns, file_format):
+        """Serialize rows lazily: a header line and one CSV line, or one JSON object per line"""
+        if file_format == 'csv':
+            writer = csv.writer(_Echo())
+            yield writer.writerow(columns)
+            for row in rows:
+                yield writer.writerow([ExportService._cell(row[column]) for column in columns])
+        else:
+            for row in rows:
+                yield json.dumps({column: row[column] for column in columns}, cls=DjangoJSONEncoder) + '\n'
+
+    @staticmethod
+    def _cell(value):
+        """CSV value; text that a spreadsheet would evaluate is prefixed with a quote"""
+        if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+            return "'" + value
+        return value
+
+    @staticmethod
+    def _batches(queryset, ordering):
+        """Lists of up to BATCH_SIZE rows (dicts including the ordering fields) in `ordering` order"""
+        paginator = KeysetPaginator(queryset, ordering, ExportService.BATCH_SIZE)
+        page = paginator.get_page()
+        while page.object_list:
+            yield page.object_list
+            if not page.has_next():
+                return
+            page = paginator.get_page(page.next_cursor)
@@ -0,0 +1,166 @@
+import json
+import logging
+import statistics
+import time
+import tracemalloc
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from products.models import Product
+from users.models import Cart, Order
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the storefront, cart, checkout and shop_admin pages against the '
+        'current database; save a JSON baseline or compare against one'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=30)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--search', default='pro', help='Query used for the search benchmark')
+        parser.add_argument('--only', nargs='*', help='Benchmark only these endpoint names')
+        parser.add_argument('--output', help='Write results to this JSON file')
+        parser.add_argument('--compare', help='Baseline JSON file to compare against')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Allowed relative p95 latency / peak memory growth before failing')
+
+    def handle(self, *args, **options):
+        customer, staff, product = self.pick_fixtures()
+        customer_client = Client()
+        customer_client.force_login(customer)
+        staff_client = Client()
+        staff_client.force_login(staff)
+
+        endpoints = [
+            ('homepage', Client(), reverse('homepage')),
+            ('homepage_search', Client(), f"{reverse('homepage')}?q={options['search']}"),
+            ('product_detail', Client(), reverse('product_detail', args=[product.id])),
+            ('cart_view', customer_client, reverse('cart')),
+            ('checkout', customer_client, reverse('checkout')),
+            ('ongoing_orders', customer_client, reverse('ongoing_orders')),
+            ('order_history', customer_client, reverse('order_history')),
+            ('admin_dashboard', staff_client, reverse('admin_dashboard')),
+            ('manage_orders', staff_client, reverse('manage_orders')),
+            ('manage_products', staff_client, reverse('manage_products')),
+            ('manage_users', staff_client, reverse('manage_users')),
+        ]
+        if options['only']:
+            endpoints = [endpoint for endpoint in endpoints if endpoint[0] in options['only']]
+
+        # The per-request instrumentation log line would drown the report
+        instrumentation = logging.getLogger('main.instrumentation')
+        previous_level = instrumentation.level
+        instrumentation.setLevel(logging.WARNING)
+        try:
+            results = {
+                name: self.measure(client, url, options['iterations'], options['warmup'])
+                for name, client, url in endpoints
+            }
+        finally:
+            instrumentation.setLevel(previous_level)
+
+        self.report(results)
+
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump({'endpoints': results}, fh, indent=2, sort_keys=True)
+            self.stdout.write(f"Saved baseline to {options['output']}")
+
+        if options['compare']:
+            with open(options['compare']) as fh:
+                baseline = json.load(fh)['endpoints']
+            regressions = self.compare(results, baseline, options['tolerance'])
+            if regressions:
+                raise CommandError('Performance regressions:\n  ' + '\n  '.join(regressions))
+            self.stdout.write(self.style.SUCCESS('No regressions against baseline'))
+
+    def pick_fixtures(self):
+        """A shopper with a cart and orders, a staff user and an active product"""
+        customer_id = Cart.objects.values_list('user_id', flat=True).first() \
+            or Order.objects.values_list('user_id', flat=True).first()
+        customer = User.objects.filter(id=customer_id).first() if customer_id else None
+        staff = User.objects.filter(is_staff=True, is_active=True).first()
+        product = Product.objects.filter(is_active=True).first()
+        if not (customer and staff and product):
+            raise CommandError(
+                'Needs at least one shopper with a cart or order, a staff user and an active '
+                'product; run `manage.py generate_sample_data` first'
+            )
+        return customer, staff, product
+
+    def measure(self, client, url, iterations, warmup):
+        for _ in range(warmup):
+            self.fetch(client, url)
+
+        latencies = []
+        queries = []
+        for _ in range(iterations):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                self.fetch(client, url)
+                latencies.append((time.perf_counter() - started) * 1000)
+            queries.append(len(captured))
+
+        # Separate pass: tracemalloc slows everything down, so it must not
+        # pollute the latency samples
+        tracemalloc.start()
+        try:
+            self.fetch(client, url)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'url': url,
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'mean_ms': round(statistics.fmean(latencies), 2),
+            'queries': max(queries),
+            'peak_memory_kb': round(peak / 1024, 1),
+        }
+
+    def fetch(self, client, url):
+        response = client.get(url)
+        if response.status_code != 200:
+            raise CommandError(f'GET {url} returned {response.status_code}')
+        # Drain streaming responses so their cost is measured too
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        return response
+
+    def report(self, results):
+        header = f"{'endpoint':<18}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}{'peak KB':>11}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<18}{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}{result['p99_ms']:>9.2f}"
+                f"{result['queries']:>9}{result['peak_memory_kb']:>11.1f}"
+            )
+
+    def compare(self, results, baseline, tolerance):
+        regressions = []
+        for name, result in results.items():
+            previous = baseline.get(name)
+            if not previous:
+                continue
+            if result['queries'] > previous['queries']:
+                regressions.append(f"{name}: queries {previous['queries']} -> {result['queries']}")
+            for metric in ('p95_ms', 'peak_memory_kb'):
+                if result[metric] > previous[metric] * (1 + tolerance):
+                    regressions.append(f'{name}: {metric} {previous[metric]} -> {result[metric]}')
+        return regressions
@@ -0,0 +1,81 @@
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.template.loader import render_to_string
+from django.test import RequestFactory, override_settings
+from django.utils import timezone
+from products.models import Product
+from products.pagination import KeysetPage
+
+
+class Command(BaseCommand):
+    help = (
+        'Time rendering products/homepage.html with N product cards, with and without '
+        'the product card fragment cache (no database access)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cards', type=int, default=500)
+        parser.add_argument('--iterations', type=int, default=30)
+
+    def handle(self, *args, **options):
+        products = self.build_products(options['cards'])
+        factory = RequestFactory()
+        visitors = [('anonymous', AnonymousUser()), ('signed in', User(id=1, username='shopper'))]
+
+        header = f"{'visitor':<12}{'card cache':<14}{'p50 ms':>9}{'mean ms':>9}"
+        self.stdout.write(f"Rendering {len(products)} cards, {options['iterations']} iterations")
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for label, user in visitors:
+            request = factory.get('/')
+            request.user = user
+            context = {
+                'products': products,
+                'page': KeysetPage(products),
+                'query': '',
+                'category': None,
+                'price_bucket': None,
+                'facets': {'categories': [{'name': 'Books', 'count': len(products)}], 'prices': []},
+            }
+            render = lambda: render_to_string('products/homepage.html', context, request)
+
+            with override_settings(PRODUCT_CARD_CACHE_TIMEOUT=0):
+                off = self.measure(render, options['iterations'])
+            caches[settings.FRAGMENT_CACHE_ALIAS].clear()
+            started = time.perf_counter()
+            render()
+            cold = [(time.perf_counter() - started) * 1000]
+            warm = self.measure(render, options['iterations'])
+
+            for mode, samples in (('off', off), ('cold', cold), ('warm', warm)):
+                self.stdout.write(
+                    f"{label:<12}{mode:<14}{statistics.median(samples):>9.2f}{statistics.fmean(samples):>9.2f}"
+                )
+
+    def build_products(self, count):
+        """Unsaved products with ids, as the catalog query would return them"""
+        now = timezone.now()
+        return [
+            Product(
+                id=index + 1, name=f'Benchmark product {index}',
+                description='A product used to benchmark homepage rendering. ' * 4,
+                price=Decimal('19.99'), stock=100, reserved=index % 5, category='Books',
+                created_at=now - timedelta(minutes=index), updated_at=now - timedelta(minutes=index),
+            )
+            for index in range(count)
+        ]
+
+    def measure(self, render, iterations):
+        render()
+        samples = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            render()
+            samples.append((time.perf_counter() - started) * 1000)
+        return samples
@@ -0,0 +1,289 @@
+import random
+import time
+from array import array
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from products.facets import CategoryFacets
+from products.models import Product
+from products.search import ProductSearchIndex
+from shop_admin.services import StatsService
+from users.models import Cart, Order, OrderItem, UserProfile
+
+# (category, share of the catalog, product nouns)
+CATEGORIES = [
+    ('Electronics', 22, ['Laptop', 'Smartphone', 'Tablet', 'Monitor', 'Headphones', 'Speaker', 'Camera']),
+    ('Accessories', 16, ['Cable', 'Charger', 'Case', 'Mouse', 'Keyboard', 'Adapter', 'Stand']),
+    ('Home & Kitchen', 14, ['Blender', 'Kettle', 'Toaster', 'Pan', 'Knife Set', 'Lamp', 'Mug']),
+    ('Clothing', 12, ['T-Shirt', 'Jacket', 'Jeans', 'Sneakers', 'Hoodie', 'Cap', 'Scarf']),
+    ('Books', 10, ['Novel', 'Cookbook', 'Biography', 'Guide', 'Anthology', 'Textbook']),
+    ('Sports', 8, ['Yoga Mat', 'Dumbbell', 'Football', 'Racket', 'Bottle', 'Backpack']),
+    ('Beauty', 6, ['Shampoo', 'Serum', 'Lotion', 'Perfume', 'Brush']),
+    ('Toys', 5, ['Puzzle', 'Board Game', 'Robot Kit', 'Plush', 'Blocks']),
+    ('Garden', 4, ['Hose', 'Planter', 'Shovel', 'Seeds', 'Gloves']),
+    ('Automotive', 3, ['Car Charger', 'Dash Cam', 'Wiper', 'Seat Cover']),
+]
+
+ADJECTIVES = ['Pro', 'Ultra', 'Classic', 'Compact', 'Premium', 'Eco', 'Smart', 'Deluxe', 'Mini', 'Max']
+FEATURES = [
+    'long battery life', 'durable build', 'lightweight design', 'fast charging', 'water resistance',
+    'ergonomic grip', 'premium materials', 'easy cleaning', 'two-year warranty', 'compact storage',
+]
+
+# (status, share of orders)
+ORDER_STATUSES = [
+    ('delivered', 55), ('shipped', 12), ('processing', 10), ('pending', 13), ('cancelled', 10),
+]
+
+GENERATED_PASSWORD = 'password123'
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """Let bulk_create keep the created_at/updated_at values we generate"""
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = 'Generate a deterministic, seeded benchmark dataset with batched inserts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--products', type=int, default=10000)
+        parser.add_argument('--users', type=int, default=2000)
+        parser.add_argument('--orders', type=int, default=20000)
+        parser.add_argument('--cart-share', type=float, default=0.3,
+                            help='Fraction of users with items in their cart')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--days', type=int, default=365,
+                            help='Spread timestamps over this many days before --until')
+        parser.add_argument('--until', default='2026-01-01',
+                            help='Newest generated timestamp (YYYY-MM-DD); fixed so runs are reproducible')
+
+    def handle(self, *args, **options):
+        if User.objects.filter(username=self.username(0)).exists():
+            raise CommandError('Generated users already exist; run this against a fresh database')
+
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.until = datetime.strptime(options['until'], '%Y-%m-%d').replace(tzinfo=dt_timezone.utc)
+        self.span = timedelta(days=options['days']).total_seconds()
+
+        started = time.perf_counter()
+        with self.fast_sqlite(), explicit_timestamps(Product, UserProfile, Cart, Order):
+            self.create_demo_accounts()
+            product_ids, prices = self.generate_products(options['products'])
+            user_ids = self.generate_users(options['users'])
+            self.generate_carts(user_ids, product_ids, options['cart_share'])
+            self.generate_orders(options['orders'], user_ids, product_ids, prices)
+
+        self.step('Rebuilding search index, category facets and dashboard counters')
+        ProductSearchIndex.rebuild()
+        CategoryFacets.rebuild()
+        StatsService.reconcile()
+        self.stdout.write(self.style.SUCCESS(f'Done in {time.perf_counter() - started:.1f}s'))
+        self.stdout.write(f'Generated users log in with password "{GENERATED_PASSWORD}"')
+
+    @contextmanager
+    def fast_sqlite(self):
+        """Trade durability for speed while bulk loading a throwaway database"""
+        if connection.vendor != 'sqlite':
+            yield
+            return
+        with connection.cursor() as cursor:
+            # journal_mode persists in the database file, so it is put back too
+            cursor.execute('PRAGMA synchronous')
+            synchronous = cursor.fetchone()[0]
+            cursor.execute('PRAGMA journal_mode')
+            journal_mode = cursor.fetchone()[0]
+            cursor.execute('PRAGMA synchronous = OFF')
+            cursor.execute('PRAGMA journal_mode = WAL')
+        try:
+            yield
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute(f'PRAGMA journal_mode = {journal_mode}')
+                cursor.execute(f'PRAGMA synchronous = {int(synchronous)}')
+
+    def create_demo_accounts(self):
+        self.step('Creating demo accounts')
+        if not User.objects.filter(username='admin').exists():
+            User.objects.create_superuser('admin', 'admin@example.com', 'admin123')
+        for username, password in [('john', 'john123'), ('jane', 'jane123')]:
+            if not User.objects.filter(username=username).exists():
+                user = User.objects.create_user(username, f'{username}@example.com', password)
+                UserProfile.objects.create(
+                    user=user,
+                    phone='1234567890',
+                    address='123 Test St',
+                    city='Test City',
+                    state='Test State',
+                    pincode='12345',
+                    created_at=self.until
+                )
+
+    def generate_products(self, count):
+        self.step(f'Generating {count} products')
+        product_ids = array('q')
+        prices = array('q')  # in cents
+        weights = [share for _, share, _ in CATEGORIES]
+        started = time.perf_counter()
+
+        for start in range(0, count, self.batch_size):
+            batch = []
+            for i in range(start, min(start + self.batch_size, count)):
+                category, _, nouns = self.rng.choices(CATEGORIES, weights)[0]
+                noun = self.rng.choice(nouns)
+                cents = int(self.rng.lognormvariate(8.0, 1.1)) + 99
+                created = self.timestamp()
+                batch.append(Product(
+                    name=f'{self.rng.choice(ADJECTIVES)} {noun} {i}',
+                    description=f'{noun} with {", ".join(self.rng.sample(FEATURES, 3))}.',
+                    price=Decimal(cents) / 100,
+                    stock=self.rng.randint(0, 500),
+                    category=category,
+                    created_at=created,
+                    updated_at=created,
+                    is_active=self.rng.random() > 0.03,
+                ))
+                prices.append(cents)
+            with transaction.atomic():
+                Product.objects.bulk_create(batch)
+            product_ids.extend(product.id for product in batch)
+            self.progress('products', len(product_ids), started)
+
+        return product_ids, prices
+
+    def generate_users(self, count):
+        self.step(f'Generating {count} users with profiles')
+        password = make_password(GENERATED_PASSWORD)
+        user_ids = array('q')
+        started = time.perf_counter()
+
+        for start in range(0, count, self.batch_size):
+            users = []
+            for i in range(start, min(start + self.batch_size, count)):
+                users.append(User(
+                    username=self.username(i),
+                    email=f'{self.username(i)}@example.com',
+                    password=password,
+                    date_joined=self.timestamp(),
+                ))
+            with transaction.atomic():
+                User.objects.bulk_create(users)
+                UserProfile.objects.bulk_create([
+                    UserProfile(
+                        user=user,
+                        phone=f'{self.rng.randint(10**9, 10**10 - 1)}',
+                        address=f'{self.rng.randint(1, 999)} Market St',
+                        city=f'City {self.rng.randint(1, 200)}',
+                        state=f'State {self.rng.randint(1, 30)}',
+                        pincode=f'{self.rng.randint(10000, 99999)}',
+                        created_at=user.date_joined,
+                    )
+                    for user in users
+                ])
+            user_ids.extend(user.id for user in users)
+            self.progress('users', len(user_ids), started)
+
+        return user_ids
+
+    def generate_carts(self, user_ids, product_ids, share):
+        self.step('Generating carts')
+        if not product_ids:
+            return
+        rows = 0
+        started = time.perf_counter()
+        batch = []
+        for user_id in user_ids:
+            if self.rng.random() >= share:
+                continue
+            for index in self.rng.sample(range(len(product_ids)), min(len(product_ids), self.rng.randint(1, 3))):
+                batch.append(Cart(
+                    user_id=user_id,
+                    product_id=product_ids[index],
+                    quantity=self.rng.randint(1, 3),
+                    added_at=self.timestamp(),
+                ))
+            if len(batch) >= self.batch_size:
+                rows += self.flush(Cart, batch)
+                self.progress('cart items', rows, started)
+        rows += self.flush(Cart, batch)
+        self.progress('cart items', rows, started)
+
+    def generate_orders(self, count, user_ids, product_ids, prices):
+        self.step(f'Generating {count} orders')
+        if not user_ids or not product_ids:
+            return
+        statuses = [status for status, _ in ORDER_STATUSES]
+        weights = [share for _, share in ORDER_STATUSES]
+        item_rows = 0
+        started = time.perf_counter()
+
+        for start in range(0, count, self.batch_size):
+            orders = []
+            lines = []
+            for _ in range(start, min(start + self.batch_size, count)):
+                picks = self.rng.sample(range(len(product_ids)), min(len(product_ids), self.rng.randint(1, 5)))
+                order_lines = [(index, self.rng.randint(1, 4)) for index in picks]
+                created = self.timestamp()
+                orders.append(Order(
+                    user_id=user_ids[self.rng.randrange(len(user_ids))],
+                    total_amount=Decimal(sum(prices[index] * qty for index, qty in order_lines)) / 100,
+                    status=self.rng.choices(statuses, weights)[0],
+                    shipping_address=f'{self.rng.randint(1, 999)} Market St',
+                    created_at=created,
+                    updated_at=min(created + timedelta(days=self.rng.randint(0, 10)), self.until),
+                ))
+                lines.append(order_lines)
+            with transaction.atomic():
+                Order.objects.bulk_create(orders)
+                items = [
+                    OrderItem(
+                        order_id=order.id,
+                        product_id=product_ids[index],
+                        quantity=qty,
+                        price=Decimal(prices[index]) / 100,
+                    )
+                    for order, order_lines in zip(orders, lines)
+                    for index, qty in order_lines
+                ]
+                OrderItem.objects.bulk_create(items, batch_size=self.batch_size)
+            item_rows += len(items)
+            self.progress('orders', start + len(orders), started, f', {item_rows} order items')
+
+    def flush(self, model, batch):
+        with transaction.atomic():
+            model.objects.bulk_create(batch)
+        rows = len(batch)
+        batch.clear()
+        return rows
+
+    def timestamp(self):
+        return self.until - timedelta(seconds=self.rng.random() * self.span)
+
+    @staticmethod
+    def username(index):
+        return f'user{index:07d}'
+
+    def step(self, message):
+        self.stdout.write(self.style.MIGRATE_HEADING(message))
+
+    def progress(self, label, rows, started, extra=''):
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        self.stdout.write(f'  {rows} {label}{extra} ({rows / elapsed:,.0f} rows/sec)')
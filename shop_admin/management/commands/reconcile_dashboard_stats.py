@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from shop_admin.services import StatsService
+
+
+class Command(BaseCommand):
+    help = 'Recompute the admin dashboard counters from the products, orders and users tables'
+
+    def handle(self, *args, **options):
+        stats = StatsService.reconcile()
+        self.stdout.write(self.style.SUCCESS(
+            f'Reconciled: {stats.products} products, {stats.orders} orders, '
+            f'{stats.users} users, revenue {stats.revenue}'
+        ))
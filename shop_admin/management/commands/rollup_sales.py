@@ -0,0 +1,18 @@
+import time
+from django.core.management.base import BaseCommand
+from shop_admin.services import SalesRollupService
+
+
+class Command(BaseCommand):
+    help = 'Update the daily sales rollups from orders changed since the last run'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help='Recompute every rollup from the complete order history')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        days = SalesRollupService.run(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Recomputed {days} day(s) of sales rollups in {time.perf_counter() - started:.2f}s'
+        ))
@@ -0,0 +1,185 @@
+import random
+import statistics
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import get_context
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections
+from django.db.models import Sum
+from products.facets import CategoryFacets
+from products.models import Product, StockReservation
+from products.search import ProductSearchIndex
+from shop_admin.services import StatsService
+from users.models import Order, OrderItem
+from users.services import CartService, OrderService
+
+
+def is_lock_error(error):
+    return 'locked' in str(error) or 'busy' in str(error)
+
+
+def run_worker(user_id, product_ids, attempts, max_retries, seed):
+    """Repeatedly fill one user's cart and check out; returns this worker's counters"""
+    rng = random.Random(seed)
+    user = User.objects.get(id=user_id)
+    stats = {
+        'orders': 0, 'sold_out': 0, 'lock_errors': 0, 'retries': 0,
+        'gave_up': 0, 'wait_seconds': 0.0, 'latencies': [],
+    }
+    try:
+        for _ in range(attempts):
+            product_id = rng.choice(product_ids)
+            quantity = rng.randint(1, 2)
+
+            added = retry(lambda: CartService.add_to_cart(user, product_id, quantity), stats, max_retries)
+            if added is None:
+                continue
+            if added[0] is None:
+                stats['sold_out'] += 1
+                continue
+
+            started = time.perf_counter()
+            placed = retry(lambda: OrderService.create_order_from_cart(user, 'Stress test'), stats, max_retries)
+            stats['latencies'].append(time.perf_counter() - started)
+            if placed and placed[0]:
+                stats['orders'] += 1
+            else:
+                if placed:
+                    stats['sold_out'] += 1
+                # Give the held units back before the next attempt
+                retry(lambda: CartService.remove_from_cart(user, product_id), stats, max_retries)
+    finally:
+        connections.close_all()
+    return stats
+
+
+def retry(operation, stats, max_retries):
+    """Run operation, retrying with backoff on SQLite lock errors; None if it never succeeds"""
+    for attempt in range(max_retries + 1):
+        started = time.perf_counter()
+        try:
+            return operation()
+        except OperationalError as error:
+            if not is_lock_error(error):
+                raise
+            stats['lock_errors'] += 1
+            if attempt == max_retries:
+                stats['gave_up'] += 1
+                stats['wait_seconds'] += time.perf_counter() - started
+                return None
+            stats['retries'] += 1
+            time.sleep(min(0.5, 0.01 * 2 ** attempt) * random.random())
+            stats['wait_seconds'] += time.perf_counter() - started
+    return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Run concurrent checkouts against a shared low-stock product set and verify '
+        'that stock is never oversold'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--processes', action='store_true',
+                            help='Use worker processes instead of threads (closer to gunicorn)')
+        parser.add_argument('--products', type=int, default=5)
+        parser.add_argument('--stock', type=int, default=20, help='Initial stock of each product')
+        parser.add_argument('--attempts', type=int, default=20, help='Checkout attempts per worker')
+        parser.add_argument('--max-retries', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--keep', action='store_true', help='Keep the generated rows afterwards')
+
+    def handle(self, *args, **options):
+        run = uuid.uuid4().hex[:8]
+        products = Product.objects.bulk_create([
+            Product(name=f'Stress {run} #{i}', description='Stress test product', price=10,
+                    stock=options['stock'], category='Stress')
+            for i in range(options['products'])
+        ])
+        users = User.objects.bulk_create([
+            User(username=f'stress-{run}-{i}') for i in range(options['workers'])
+        ])
+        product_ids = [product.id for product in products]
+        initial = {product.id: options['stock'] for product in products}
+
+        self.stdout.write(
+            f"Run {run}: {options['workers']} {'processes' if options['processes'] else 'threads'}, "
+            f"{len(products)} products x {options['stock']} units, {options['attempts']} attempts each"
+        )
+
+        # Workers must not inherit (or share) this thread's connection
+        connections.close_all()
+        if options['processes']:
+            executor = ProcessPoolExecutor(options['workers'], mp_context=get_context('fork'))
+        else:
+            executor = ThreadPoolExecutor(options['workers'])
+
+        started = time.perf_counter()
+        with executor:
+            futures = [
+                executor.submit(run_worker, user.id, product_ids, options['attempts'],
+                                options['max_retries'], options['seed'] + i)
+                for i, user in enumerate(users)
+            ]
+            results = [future.result() for future in futures]
+        elapsed = time.perf_counter() - started
+
+        try:
+            self.report(results, elapsed)
+            self.verify(product_ids, initial)
+        finally:
+            if options['keep']:
+                # bulk_create skipped the search index, like the counters below
+                ProductSearchIndex.index_products(products)
+            else:
+                Order.objects.filter(user__in=users).delete()
+                StockReservation.objects.filter(user__in=users).delete()
+                User.objects.filter(id__in=[user.id for user in users]).delete()
+                Product.objects.filter(id__in=product_ids).delete()
+            # The rows were created (and deleted) behind the services' backs
+            StatsService.reconcile()
+            CategoryFacets.rebuild()
+
+    def report(self, results, elapsed):
+        totals = {
+            key: sum(result[key] for result in results)
+            for key in ('orders', 'sold_out', 'lock_errors', 'retries', 'gave_up', 'wait_seconds')
+        }
+        latencies = sorted(latency for result in results for latency in result['latencies'])
+
+        self.stdout.write(f"Orders placed:        {totals['orders']} ({totals['orders'] / elapsed:.1f} orders/sec)")
+        self.stdout.write(f"Rejected (sold out):  {totals['sold_out']}")
+        self.stdout.write(f"'database is locked': {totals['lock_errors']} "
+                          f"({totals['retries']} retried, {totals['gave_up']} gave up)")
+        self.stdout.write(f"Time lost to locks:   {totals['wait_seconds']:.2f}s")
+        if latencies:
+            self.stdout.write(
+                f"Checkout latency:     p50 {statistics.median(latencies) * 1000:.1f} ms, "
+                f"max {latencies[-1] * 1000:.1f} ms"
+            )
+
+    def verify(self, product_ids, initial):
+        """stock + units sold must equal the initial stock for every product"""
+        sold = dict(
+            OrderItem.objects.filter(product_id__in=product_ids)
+            .values('product_id').annotate(total=Sum('quantity'))
+            .values_list('product_id', 'total')
+        )
+        problems = []
+        for product_id, stock, reserved in Product.objects.filter(id__in=product_ids) \
+                .values_list('id', 'stock', 'reserved'):
+            if stock < 0 or reserved < 0:
+                problems.append(f'product {product_id}: stock {stock}, reserved {reserved}')
+            if stock + sold.get(product_id, 0) != initial[product_id]:
+                problems.append(
+                    f'product {product_id}: stock {stock} + sold {sold.get(product_id, 0)} '
+                    f'!= initial {initial[product_id]}'
+                )
+        if problems:
+            raise CommandError('Stock invariant violated:\n  ' + '\n  '.join(problems))
+        self.stdout.write(self.style.SUCCESS(
+            f'Stock invariant holds: {sum(sold.values())} units sold, none oversold'
+        ))
@@ -0,0 +1,35 @@
+# Generated by Django 6.0.1 on 2026-10-18 17:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('products', models.IntegerField(default=0)),
+                ('active_products', models.IntegerField(default=0)),
+                ('users', models.IntegerField(default=0)),
+                ('orders', models.IntegerField(default=0)),
+                ('orders_pending', models.IntegerField(default=0)),
+                ('orders_processing', models.IntegerField(default=0)),
+                ('orders_shipped', models.IntegerField(default=0)),
+                ('orders_delivered', models.IntegerField(default=0)),
+                ('orders_cancelled', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('reconciled_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'dashboard stats',
+            },
+        ),
+    ]
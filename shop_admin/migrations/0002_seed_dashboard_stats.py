@@ -0,0 +1,41 @@
+from decimal import Decimal
+from django.db import migrations
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+STATUSES = ['pending', 'processing', 'shipped', 'delivered', 'cancelled']
+
+
+def seed_dashboard_stats(apps, schema_editor):
+    DashboardStats = apps.get_model('shop_admin', 'DashboardStats')
+    Product = apps.get_model('products', 'Product')
+    Order = apps.get_model('users', 'Order')
+    User = apps.get_model('auth', 'User')
+
+    products = Product.objects.aggregate(total=Count('id'), active=Count('id', filter=Q(is_active=True)))
+    by_status = dict(Order.objects.order_by().values('status').annotate(n=Count('id')).values_list('status', 'n'))
+    revenue = Order.objects.exclude(status='cancelled').aggregate(total=Sum('total_amount'))['total']
+
+    DashboardStats.objects.update_or_create(id=1, defaults={
+        'products': products['total'],
+        'active_products': products['active'],
+        'users': User.objects.count(),
+        'orders': sum(by_status.values()),
+        'revenue': revenue or Decimal(0),
+        'reconciled_at': timezone.now(),
+        **{f'orders_{status}': by_status.get(status, 0) for status in STATUSES},
+    })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop_admin', '0001_dashboard_stats'),
+        ('products', '0004_stock_reservations'),
+        ('users', '0001_initial'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_dashboard_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+from django.db import migrations
+
+# auth.User belongs to django.contrib, so the indexes behind the shop_admin
+# user table (newest first, optionally staff only) are created here. The
+# active filter matches nearly every row and needs no index of its own.
+# is_staff=True compiles to a bare WHERE "is_staff" on SQLite, which cannot
+# use an index led by is_staff; a partial index with the same condition can.
+# Customers (is_staff=False) are nearly every row and use
+# shop_admin_user_joined_idx.
+INDEXES = [
+    ('shop_admin_user_joined_idx', 'date_joined, id', ''),
+    ('shop_admin_user_staff_joined_idx', 'date_joined, id', ' WHERE is_staff'),
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('shop_admin', '0003_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            f'CREATE INDEX {name} ON auth_user ({columns}){condition}',
+            f'DROP INDEX {name}',
+        )
+        for name, columns, condition in INDEXES
+    ]
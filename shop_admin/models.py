@@ -1,3 +1,75 @@
 from django.db import models
 
-# Create your models here.
+class DashboardStats(models.Model):
+    """Single-row summary the admin dashboard reads instead of counting tables.
+
+    Kept up to date incrementally by the service layer (and user signals);
+    `manage.py reconcile_dashboard_stats` recomputes it from scratch.
+    Revenue is the total of all orders that are not cancelled.
+    """
+    products = models.IntegerField(default=0)
+    active_products = models.IntegerField(default=0)
+    users = models.IntegerField(default=0)
+    orders = models.IntegerField(default=0)
+    orders_pending = models.IntegerField(default=0)
+    orders_processing = models.IntegerField(default=0)
+    orders_shipped = models.IntegerField(default=0)
+    orders_delivered = models.IntegerField(default=0)
+    orders_cancelled = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    reconciled_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Dashboard stats (updated {self.updated_at:%Y-%m-%d %H:%M})"
+
+    class Meta:
+        verbose_name_plural = 'dashboard stats'
+
+class DailySales(models.Model):
+    """Orders, units and revenue per day (order creation date), cancellations excluded"""
+    date = models.DateField(unique=True)
+    orders = models.IntegerField(default=0)
+    units = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"{self.date}: {self.orders} orders"
+
+    class Meta:
+        ordering = ['-date']
+        verbose_name_plural = 'daily sales'
+
+class DailyCategorySales(models.Model):
+    date = models.DateField()
+    category = models.CharField(max_length=100)
+    units = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"{self.date} {self.category}: {self.units} units"
+
+    class Meta:
+        unique_together = ('date', 'category')
+        verbose_name_plural = 'daily category sales'
+
+class DailyProductSales(models.Model):
+    date = models.DateField()
+    product = models.ForeignKey('products.Product', on_delete=models.CASCADE, related_name='daily_sales')
+    units = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"{self.date} {self.product_id}: {self.units} units"
+
+    class Meta:
+        unique_together = ('date', 'product')
+        verbose_name_plural = 'daily product sales'
+
+class RollupState(models.Model):
+    """Watermark of the sales rollup job: orders updated after it are not rolled up yet"""
+    watermark = models.DateTimeField(null=True, blank=True)
+    last_run_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Sales rollup up to {self.watermark}"
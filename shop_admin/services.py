@@ -0,0 +1,311 @@
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from products.models import Product
+from products.pagination import InvalidCursor, KeysetPaginator
+from users.models import Order, OrderItem
+from .models import DailyCategorySales, DailyProductSales, DailySales, DashboardStats, RollupState
+
+STATS_ID = 1
+
+
+class StatsService:
+    @staticmethod
+    def get_stats():
+        """Get the dashboard summary row (one query)"""
+        stats = DashboardStats.objects.filter(id=STATS_ID).first()
+        return stats or StatsService.reconcile()
+
+    @staticmethod
+    def increment(**deltas):
+        """Apply counter deltas, e.g. increment(orders=1, orders_pending=1, revenue=total)"""
+        deltas = {field: delta for field, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        updated = DashboardStats.objects.filter(id=STATS_ID).update(
+            updated_at=timezone.now(),
+            **{field: F(field) + delta for field, delta in deltas.items()}
+        )
+        if not updated:
+            StatsService.reconcile()
+
+    @staticmethod
+    def order_status_changed(old_status, new_status, total_amount, count=1):
+        """Move `count` orders (worth total_amount together) between status counters"""
+        if old_status == new_status:
+            return
+        revenue = Decimal(0)
+        if new_status == 'cancelled':
+            revenue -= total_amount
+        elif old_status == 'cancelled':
+            revenue += total_amount
+        StatsService.increment(**{
+            f'orders_{old_status}': -count,
+            f'orders_{new_status}': count,
+            'revenue': revenue,
+        })
+
+    @staticmethod
+    def reconcile():
+        """Recompute every counter from the source tables"""
+        products = Product.objects.aggregate(
+            total=Count('id'),
+            active=Count('id', filter=Q(is_active=True))
+        )
+        by_status = dict(
+            Order.objects.order_by().values('status')
+            .annotate(n=Count('id')).values_list('status', 'n')
+        )
+        revenue = Order.objects.exclude(status='cancelled').aggregate(
+            total=Sum('total_amount')
+        )['total'] or Decimal(0)
+
+        values = {
+            'products': products['total'],
+            'active_products': products['active'],
+            'users': User.objects.count(),
+            'orders': sum(by_status.values()),
+            'revenue': revenue,
+            'reconciled_at': timezone.now(),
+        }
+        for status, _ in Order.STATUS_CHOICES:
+            values[f'orders_{status}'] = by_status.get(status, 0)
+
+        stats, _ = DashboardStats.objects.update_or_create(id=STATS_ID, defaults=values)
+        return stats
+
+
+class SalesRollupService:
+    """Daily sales rollups (overall, per category, per product).
+
+    Each run finds the days of orders whose updated_at is past the stored
+    watermark and recomputes only those day buckets from the orders created
+    on them. Recomputing whole days makes runs idempotent, so status changes
+    (e.g. a cancellation weeks later) simply correct the old bucket, and the
+    small overlap re-scanned on every run covers transactions that committed
+    late with an older updated_at.
+    """
+
+    OVERLAP = timedelta(minutes=5)
+    DAYS_PER_BATCH = 31
+
+    @staticmethod
+    def run(full=False):
+        """Bring the rollups up to date; returns the number of days recomputed"""
+        started = timezone.now()
+        state, _ = RollupState.objects.get_or_create(id=1)
+
+        orders = Order.objects.order_by()
+        if state.watermark and not full:
+            orders = orders.filter(updated_at__gt=state.watermark - SalesRollupService.OVERLAP)
+
+        days = sorted(set(
+            orders.annotate(day=TruncDate('created_at')).values_list('day', flat=True).distinct()
+        ))
+        # Each batch replaces its days' buckets in one transaction, so readers
+        # see either the old or the new figures of a day, never an empty table
+        for start in range(0, len(days), SalesRollupService.DAYS_PER_BATCH):
+            SalesRollupService.rebuild_days(days[start:start + SalesRollupService.DAYS_PER_BATCH])
+        if full:
+            # Days that no longer have any order (e.g. deleted ones)
+            with transaction.atomic():
+                for model in (DailySales, DailyCategorySales, DailyProductSales):
+                    model.objects.exclude(date__in=days).delete()
+
+        state.watermark = started
+        state.last_run_at = timezone.now()
+        state.save()
+        return len(days)
+
+    @staticmethod
+    @transaction.atomic
+    def rebuild_days(days):
+        """Recompute every rollup bucket for the given dates"""
+        in_days = Q()
+        for day in days:
+            start = timezone.make_aware(datetime.combine(day, time.min))
+            in_days |= Q(created_at__gte=start, created_at__lt=start + timedelta(days=1))
+
+        orders = Order.objects.order_by().filter(in_days).exclude(status='cancelled')
+        items = OrderItem.objects.filter(order__in=orders).annotate(
+            day=TruncDate('order__created_at'),
+            line_total=ExpressionWrapper(
+                F('price') * F('quantity'),
+                output_field=DecimalField(max_digits=14, decimal_places=2)
+            )
+        )
+
+        DailySales.objects.filter(date__in=days).delete()
+        DailyCategorySales.objects.filter(date__in=days).delete()
+        DailyProductSales.objects.filter(date__in=days).delete()
+
+        units_by_day = dict(
+            items.values('day').annotate(units=Sum('quantity')).values_list('day', 'units')
+        )
+        DailySales.objects.bulk_create([
+            DailySales(date=row['day'], orders=row['orders'], revenue=row['revenue'],
+                       units=units_by_day.get(row['day'], 0))
+            for row in orders.annotate(day=TruncDate('created_at')).values('day').annotate(
+                orders=Count('id'), revenue=Sum('total_amount')
+            )
+        ])
+        DailyCategorySales.objects.bulk_create([
+            DailyCategorySales(date=row['day'], category=row['product__category'],
+                               units=row['units'], revenue=row['revenue'])
+            for row in items.values('day', 'product__category').annotate(
+                units=Sum('quantity'), revenue=Sum('line_total')
+            )
+        ])
+        DailyProductSales.objects.bulk_create([
+            DailyProductSales(date=row['day'], product_id=row['product_id'],
+                              units=row['units'], revenue=row['revenue'])
+            for row in items.values('day', 'product_id').annotate(
+                units=Sum('quantity'), revenue=Sum('line_total')
+            )
+        ], batch_size=1000)
+
+    @staticmethod
+    def get_report(start, end, top=10):
+        """Sales between two dates (inclusive), read from the rollup tables only"""
+        days = DailySales.objects.filter(date__gte=start, date__lte=end).order_by('date')
+        totals = days.aggregate(orders=Sum('orders'), units=Sum('units'), revenue=Sum('revenue'))
+        categories = DailyCategorySales.objects.filter(date__gte=start, date__lte=end) \
+            .values('category').annotate(units=Sum('units'), revenue=Sum('revenue')) \
+            .order_by('-revenue')
+        products = DailyProductSales.objects.filter(date__gte=start, date__lte=end) \
+            .values('product_id', 'product__name').annotate(units=Sum('units'), revenue=Sum('revenue')) \
+            .order_by('-revenue')[:top]
+        return {
+            'days': days,
+            'totals': totals,
+            'categories': categories,
+            'products': products,
+            'state': RollupState.objects.filter(id=1).first(),
+        }
+
+
+class AdminListService:
+    """Filtered, sorted, keyset-paginated tables for the shop_admin pages.
+
+    Every list method returns (page, estimate). The estimate is a row count
+    for the page header that never runs an unbounded COUNT(*): unfiltered
+    lists (and orders filtered by status alone) read the dashboard counters,
+    anything else counts at most ESTIMATE_CAP + 1 rows and is shown as
+    "N+" when it hits the cap.
+    """
+
+    ESTIMATE_CAP = 1000
+
+    ORDER_SORTS = {
+        'newest': ['-created_at', '-id'],
+        'oldest': ['created_at', 'id'],
+        'total_desc': ['-total_amount', '-id'],
+        'total_asc': ['total_amount', 'id'],
+    }
+    PRODUCT_SORTS = {
+        'newest': ['-created_at', '-id'],
+        'name': ['name', 'id'],
+        'price_asc': ['price', 'id'],
+        'price_desc': ['-price', '-id'],
+        'stock': ['stock', 'id'],
+    }
+    USER_SORTS = {
+        'newest': ['-date_joined', '-id'],
+        'username': ['username'],
+    }
+
+    @staticmethod
+    def get_orders_page(status='', date_from=None, date_to=None, sort='newest', cursor=None, per_page=50):
+        """Orders filtered by status and creation date range (inclusive dates)"""
+        orders = AdminListService.filter_orders(status, date_from, date_to).select_related('user')
+
+        estimate = None
+        if not (date_from or date_to):
+            stats = StatsService.get_stats()
+            estimate = getattr(stats, f'orders_{status}') if status else stats.orders
+
+        return AdminListService._paginate(orders, AdminListService.ORDER_SORTS, sort, cursor, per_page, estimate)
+
+    @staticmethod
+    def filter_orders(status='', date_from=None, date_to=None):
+        """The orders matching the manage_orders filters"""
+        orders = Order.objects.all()
+        if status:
+            orders = orders.filter(status=status)
+        if date_from:
+            orders = orders.filter(created_at__gte=AdminListService._day_start(date_from))
+        if date_to:
+            orders = orders.filter(created_at__lt=AdminListService._day_start(date_to + timedelta(days=1)))
+        return orders
+
+    @staticmethod
+    def filter_products(category='', active=None, low_stock=False, updated_from=None, updated_to=None):
+        """The products matching the manage_products filters, optionally by last update date"""
+        products = Product.objects.all()
+        if category:
+            products = products.filter(category=category)
+        if active is not None:
+            products = products.filter(is_active=active)
+        if low_stock:
+            products = products.filter(stock__lte=settings.LOW_STOCK_THRESHOLD)
+        if updated_from:
+            products = products.filter(updated_at__gte=AdminListService._day_start(updated_from))
+        if updated_to:
+            products = products.filter(updated_at__lt=AdminListService._day_start(updated_to + timedelta(days=1)))
+        return products
+
+    @staticmethod
+    def get_products_page(category='', active=None, low_stock=False, sort='newest', cursor=None, per_page=50):
+        """Products filtered by category, active flag and low stock"""
+        products = AdminListService.filter_products(category, active, low_stock)
+
+        estimate = None
+        if not (category or low_stock):
+            stats = StatsService.get_stats()
+            if active is None:
+                estimate = stats.products
+            else:
+                estimate = stats.active_products if active else stats.products - stats.active_products
+
+        return AdminListService._paginate(products, AdminListService.PRODUCT_SORTS, sort, cursor, per_page, estimate)
+
+    @staticmethod
+    def get_users_page(staff=None, active=None, sort='newest', cursor=None, per_page=50):
+        """Users filtered by staff and active flags"""
+        users = User.objects.all()
+        if staff is not None:
+            users = users.filter(is_staff=staff)
+        if active is not None:
+            users = users.filter(is_active=active)
+
+        estimate = None
+        if staff is None and active is None:
+            estimate = StatsService.get_stats().users
+
+        return AdminListService._paginate(users, AdminListService.USER_SORTS, sort, cursor, per_page, estimate)
+
+    @staticmethod
+    def _paginate(queryset, sorts, sort, cursor, per_page, estimate):
+        ordering = sorts.get(sort) or next(iter(sorts.values()))
+        paginator = KeysetPaginator(queryset, ordering, per_page)
+        try:
+            page = paginator.get_page(cursor)
+        except InvalidCursor:
+            page = paginator.get_page()
+
+        if estimate is not None:
+            return page, {'count': max(estimate, 0), 'capped': False}
+        count = queryset.order_by().values('pk')[:AdminListService.ESTIMATE_CAP + 1].count()
+        return page, {
+            'count': min(count, AdminListService.ESTIMATE_CAP),
+            'capped': count > AdminListService.ESTIMATE_CAP,
+        }
+
+    @staticmethod
+    def _day_start(day):
+        return timezone.make_aware(datetime.combine(day, time.min))
@@ -1,3 +1,171 @@
-from django.test import TestCase
+import csv
+import gzip
+import unittest
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+from django.contrib.auth.models import User
+from django.db import connection
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from main.testing import IsolatedCacheTestCase
+from products.models import Product
+from products.services import ProductService
+from users.models import Order, OrderItem
+from users.services import CartService, OrderService
+from .exports import ORDER_COLUMNS, ExportService
+from .models import DailySales, DashboardStats
+from .services import AdminListService, SalesRollupService, StatsService
 
-# Create your tests here.
+
+class SalesRollupTests(IsolatedCacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('shopper', 'shopper@example.com', 'secret')
+        self.product = Product.objects.create(name='Widget', description='', price=5, stock=10, category='Test')
+
+    def place_order(self, days_ago, quantity=1):
+        order = Order.objects.create(user=self.user, total_amount=5 * quantity, shipping_address='x')
+        OrderItem.objects.create(order=order, product=self.product, quantity=quantity, price=5)
+        created = timezone.now() - timedelta(days=days_ago)
+        Order.objects.filter(id=order.id).update(created_at=created, updated_at=created)
+        return order
+
+    def totals(self):
+        return {row.date: (row.orders, row.units, row.revenue) for row in DailySales.objects.all()}
+
+    def test_incremental_run_only_recomputes_days_updated_after_the_watermark(self):
+        self.place_order(days_ago=10, quantity=2)
+        self.assertEqual(SalesRollupService.run(), 1)
+
+        recent = self.place_order(days_ago=0)
+        Order.objects.filter(id=recent.id).update(updated_at=timezone.now() + timedelta(minutes=1))
+        self.assertEqual(SalesRollupService.run(), 1)
+
+        self.assertEqual(self.totals(), {
+            timezone.localdate() - timedelta(days=10): (1, 2, Decimal('10.00')),
+            timezone.localdate(): (1, 1, Decimal('5.00')),
+        })
+
+    def test_cancelled_order_leaves_its_day_and_full_run_agrees(self):
+        kept = self.place_order(days_ago=3)
+        cancelled = self.place_order(days_ago=3, quantity=4)
+        SalesRollupService.run()
+        day = timezone.localdate() - timedelta(days=3)
+        self.assertEqual(self.totals(), {day: (2, 5, Decimal('25.00'))})
+
+        OrderService.cancel_order(cancelled.id, self.user)
+        SalesRollupService.run()
+        self.assertEqual(self.totals(), {day: (1, 1, Decimal('5.00'))})
+
+        Order.objects.filter(id=kept.id).update(status='cancelled')
+        SalesRollupService.run(full=True)
+        self.assertEqual(self.totals(), {})
+
+
+class ExportServiceTests(IsolatedCacheTestCase):
+    def test_batched_export_has_every_row_once_and_no_formulas(self):
+        user = User.objects.create_user('shopper', 'shopper@example.com', 'secret')
+        product = Product.objects.create(name='=HYPERLINK("http://x")', description='', price=5, stock=10,
+                                         category='Test')
+        orders = Order.objects.bulk_create([
+            Order(user=user, total_amount=5, shipping_address=f'{index} Main St') for index in range(7)
+        ])
+        # Several orders share a created_at, so batches must break ties on id
+        Order.objects.filter(id__in=[order.id for order in orders[:4]]).update(created_at=timezone.now())
+        OrderItem.objects.bulk_create([OrderItem(order=order, product=product, quantity=1, price=5)
+                                       for order in orders])
+
+        with mock.patch.object(ExportService, 'BATCH_SIZE', 3):
+            lines = list(ExportService.render(ExportService.order_rows(Order.objects.all()), ORDER_COLUMNS, 'csv'))
+        rows = list(csv.DictReader(lines))
+
+        self.assertEqual(sorted(int(row['order_id']) for row in rows), sorted(order.id for order in orders))
+        self.assertEqual({row['product_name'] for row in rows}, {"'=HYPERLINK(\"http://x\")"})
+
+
+class DashboardStatsTests(IsolatedCacheTestCase):
+    COUNTERS = ['products', 'active_products', 'users', 'orders', 'orders_pending', 'orders_processing',
+                'orders_shipped', 'orders_delivered', 'orders_cancelled', 'revenue']
+
+    def counters(self):
+        return DashboardStats.objects.values(*self.COUNTERS).get()
+
+    def test_maintained_counters_match_reconcile(self):
+        StatsService.reconcile()
+        shopper = User.objects.create_user('shopper', 'shopper@example.com', 'secret')
+        lamp = ProductService.create_product('Lamp', '', Decimal('20'), 10, 'Home')
+        desk = ProductService.create_product('Desk', '', Decimal('50'), 10, 'Home')
+        ProductService.update_product(desk.id, is_active=False)
+        ProductService.update_product(desk.id, is_active=True)
+        ProductService.delete_product(lamp.id)
+        ProductService.update_product(lamp.id, price=Decimal('25'))
+
+        orders = []
+        for _ in range(3):
+            CartService.add_to_cart(shopper, desk.id, 1)
+            orders.append(OrderService.create_order_from_cart(shopper, '1 Main St')[0])
+        OrderService.cancel_order(orders[0].id, shopper)
+        OrderService.update_order_status(orders[1].id, 'shipped')
+        OrderService.bulk_update_status(Order.objects.filter(id=orders[2].id), 'cancelled')
+
+        maintained = self.counters()
+        self.assertEqual(maintained['orders_cancelled'], 2)
+        self.assertEqual(maintained['revenue'], Decimal('50'))
+        StatsService.reconcile()
+        self.assertEqual(self.counters(), maintained)
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'Reads SQLite EXPLAIN QUERY PLAN output')
+class AdminListIndexTests(IsolatedCacheTestCase):
+    def plans(self, table, load_page):
+        with CaptureQueriesContext(connection) as captured:
+            load_page()
+        page_query = next(query['sql'] for query in captured
+                          if f'FROM "{table}"' in query['sql'] and ' LIMIT ' in query['sql'])
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {page_query}')
+            return [row[-1] for row in cursor.fetchall()]
+
+    def test_every_sort_reads_pages_in_index_order(self):
+        pages = {}
+        for sort in AdminListService.PRODUCT_SORTS:
+            pages[f'products {sort}'] = ('products_product',
+                                         lambda sort=sort: AdminListService.get_products_page(sort=sort))
+        pages['low stock'] = ('products_product',
+                              lambda: AdminListService.get_products_page(low_stock=True, sort='stock'))
+        for sort in AdminListService.ORDER_SORTS:
+            pages[f'orders {sort}'] = ('users_order', lambda sort=sort: AdminListService.get_orders_page(sort=sort))
+
+        for name, (table, load_page) in pages.items():
+            with self.subTest(name):
+                plan = self.plans(table, load_page)
+                self.assertFalse([step for step in plan if 'TEMP B-TREE' in step], plan)
+                self.assertTrue([step for step in plan if 'INDEX' in step], plan)
+
+
+class ImportProductsViewTests(IsolatedCacheTestCase):
+    FEED = b'sku,name,price,stock,category\n' + b''.join(
+        f'S-{index},Item {index},1.50,3,Books\n'.encode() for index in range(50)
+    )
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(User.objects.create_user('staff', 'staff@example.com', 'secret', is_staff=True))
+
+    def upload(self, name, content):
+        return self.client.post('/shop-admin/products/import/', {'feed': SimpleUploadedFile(name, content)})
+
+    @override_settings(CATALOG_UPLOAD_MAX_SIZE=1024)
+    def test_feeds_over_the_limit_are_refused_before_importing(self):
+        # Small once compressed, but over the limit uncompressed
+        for name, content in (('feed.csv', self.FEED), ('feed.csv.gz', gzip.compress(self.FEED))):
+            with self.subTest(name):
+                response = self.upload(name, content)
+                self.assertContains(response, 'manage.py import_products instead')
+        self.assertFalse(Product.objects.exists())
+
+        self.upload('small.csv', b''.join(self.FEED.splitlines(keepends=True)[:6]))
+        self.assertEqual(Product.objects.count(), 5)
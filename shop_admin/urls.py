@@ -3,11 +3,17 @@ from . import views
 
 urlpatterns = [
     path('dashboard/', views.admin_dashboard, name='admin_dashboard'),
+    path('analytics/', views.sales_analytics, name='sales_analytics'),
     path('products/', views.manage_products, name='manage_products'),
+    path('products/bulk-edit/', views.bulk_edit_products, name='bulk_edit_products'),
+    path('products/export/', views.export_products, name='export_products'),
+    path('products/import/', views.import_products, name='import_products'),
     path('products/add/', views.add_product, name='add_product'),
     path('products/edit/<int:product_id>/', views.edit_product, name='edit_product'),
     path('products/delete/<int:product_id>/', views.delete_product, name='delete_product'),
     path('orders/', views.manage_orders, name='manage_orders'),
+    path('orders/export/', views.export_orders, name='export_orders'),
+    path('orders/bulk-status/', views.bulk_update_order_status, name='bulk_update_order_status'),
     path('orders/update/<int:order_id>/', views.update_order_status_view, name='update_order_status'),
     path('users/', views.manage_users, name='manage_users'),
 ]
@@ -1,54 +1,233 @@
+import gzip
+import io
+import json
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect
+from django.utils.dateparse import parse_date
+from django.utils import timezone
 from django.contrib.admin.views.decorators import staff_member_required
-from django.contrib.auth.models import User
+from django.views.decorators.http import require_POST
 from django.contrib import messages
+from products.cache import ProductCache
+from products.importer import CatalogImporter
 from products.models import Product
 from products.services import ProductService
 from users.models import Order
 from users.services import OrderService
+from .exports import ORDER_COLUMNS, PRODUCT_COLUMNS, ExportService
+from .services import AdminListService, SalesRollupService, StatsService
+
+
+def _flag(value):
+    """'1'/'0' query parameter to True/False; anything else means no filter"""
+    return {'1': True, '0': False}.get(value)
+
+
+def _date(value):
+    try:
+        return parse_date(value or '')
+    except ValueError:
+        return None
+
+
+def _feed_size(upload):
+    """Uncompressed size of an uploaded feed; gzip stores it (mod 2**32) in its last four bytes"""
+    if not upload.name.lower().endswith('.gz') or upload.size < 4:
+        return upload.size
+    upload.seek(-4, io.SEEK_END)
+    size = int.from_bytes(upload.read(4), 'little')
+    upload.seek(0)
+    return max(size, upload.size)
+
+
+def _price_and_stock(params):
+    """Decimal price and int stock from a product form, or (None, None) if either is invalid"""
+    try:
+        price = Decimal(params.get('price', ''))
+        stock = int(params.get('stock', ''))
+    except (InvalidOperation, ValueError):
+        return None, None
+    if not price.is_finite() or price < 0 or stock < 0:
+        return None, None
+    return price, stock
+
+
+def _export_response(rows, columns, file_format, name):
+    content_type = 'text/csv' if file_format == 'csv' else 'application/x-ndjson'
+    response = StreamingHttpResponse(
+        ExportService.render(rows, columns, file_format),
+        content_type=f'{content_type}; charset=utf-8'
+    )
+    filename = f"{name}-{timezone.localdate():%Y%m%d}.{file_format}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def _order_filters(params):
+    status = params.get('status', '')
+    return {
+        'status': status if status in dict(Order.STATUS_CHOICES) else '',
+        'date_from': _date(params.get('date_from')),
+        'date_to': _date(params.get('date_to')),
+    }
+
 
 @staff_member_required
 def admin_dashboard(request):
     """Admin dashboard"""
-    total_products = Product.objects.count()
-    total_orders = Order.objects.count()
-    total_users = User.objects.count()
-    pending_orders = Order.objects.filter(status='pending').count()
-    
+    stats = StatsService.get_stats()
+
     context = {
-        'total_products': total_products,
-        'total_orders': total_orders,
-        'total_users': total_users,
-        'pending_orders': pending_orders
+        'total_products': stats.products,
+        'total_orders': stats.orders,
+        'total_users': stats.users,
+        'pending_orders': stats.orders_pending,
+        'stats': stats,
+        'product_cache': ProductCache.stats()
     }
     return render(request, 'shop_admin/dashboard.html', context)
 
+@staff_member_required
+def sales_analytics(request):
+    """Sales analytics, read from the daily rollup tables"""
+    try:
+        days = max(1, min(int(request.GET.get('days', 30)), 3660))
+    except ValueError:
+        days = 30
+    end = timezone.localdate()
+    start = end - timedelta(days=days - 1)
+
+    context = SalesRollupService.get_report(start, end)
+    context.update({'days_shown': days, 'start': start, 'end': end})
+    return render(request, 'shop_admin/analytics.html', context)
+
 @staff_member_required
 def manage_products(request):
     """Manage products"""
-    products = Product.objects.all()
-    context = {'products': products}
+    filters = {
+        'category': request.GET.get('category', '').strip(),
+        'active': _flag(request.GET.get('active')),
+        'low_stock': request.GET.get('low_stock') == '1',
+        'sort': request.GET.get('sort', 'newest'),
+    }
+    page, estimate = AdminListService.get_products_page(
+        **filters, cursor=request.GET.get('cursor'), per_page=settings.ADMIN_ROWS_PER_PAGE
+    )
+    context = {
+        'products': page.object_list,
+        'page': page,
+        'estimate': estimate,
+        'filters': filters,
+        'low_stock_threshold': settings.LOW_STOCK_THRESHOLD,
+    }
     return render(request, 'shop_admin/manage_products.html', context)
 
+@staff_member_required
+@require_POST
+def bulk_edit_products(request):
+    """Save the price and stock cells edited in the manage_products grid"""
+    try:
+        rows = json.loads(request.body)['rows']
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'Expected a JSON body with a "rows" list'}, status=400)
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        return JsonResponse({'error': 'Expected a JSON body with a "rows" list'}, status=400)
+
+    updated, conflicts, errors = ProductService.bulk_edit_products(rows)
+    message = f"{len(updated)} product(s) updated"
+    if conflicts:
+        message += f", {len(conflicts)} changed by someone else (reload to see their values)"
+    if errors:
+        message += f", {len(errors)} invalid"
+    return JsonResponse({
+        'message': message,
+        'updated': {product_id: value.isoformat() for product_id, value in updated.items()},
+        'conflicts': conflicts,
+        'errors': errors,
+    })
+
+@staff_member_required
+def export_products(request):
+    """Stream the catalog (manage_products filters plus an updated date range) as CSV or JSON Lines"""
+    file_format = request.GET.get('format', 'csv')
+    if file_format not in ExportService.FORMATS:
+        file_format = 'csv'
+    products = AdminListService.filter_products(
+        category=request.GET.get('category', '').strip(),
+        active=_flag(request.GET.get('active')),
+        low_stock=request.GET.get('low_stock') == '1',
+        updated_from=_date(request.GET.get('updated_from')),
+        updated_to=_date(request.GET.get('updated_to')),
+    )
+    return _export_response(ExportService.product_rows(products), PRODUCT_COLUMNS, file_format, 'products')
+
+@staff_member_required
+def import_products(request):
+    """Upload a CSV / JSON Lines catalog feed and upsert it on SKU"""
+    context = {'formats': CatalogImporter.FORMATS, 'max_size_mb': settings.CATALOG_UPLOAD_MAX_SIZE // (1024 * 1024)}
+    if request.method == 'POST':
+        upload = request.FILES.get('feed')
+        file_format = request.POST.get('format') or (upload and CatalogImporter.detect_format(upload.name))
+        if not upload or file_format not in CatalogImporter.FORMATS:
+            messages.error(request, 'Choose a .csv or .jsonl file (optionally gzipped)')
+            return render(request, 'shop_admin/import_products.html', context)
+        # The import runs inside this request; a feed that would outlast the
+        # worker timeout would stop halfway with only some batches committed
+        limit = settings.CATALOG_UPLOAD_MAX_SIZE
+        if _feed_size(upload) > limit:
+            messages.error(
+                request,
+                f'{upload.name} is larger than {limit // (1024 * 1024)} MB uncompressed; '
+                f'import it with manage.py import_products instead'
+            )
+            return render(request, 'shop_admin/import_products.html', context)
+        try:
+            batch_size = max(1, min(int(request.POST.get('batch_size', 1000)), 10000))
+        except ValueError:
+            batch_size = 1000
+
+        # Uploads past FILE_UPLOAD_MAX_MEMORY_SIZE are spooled to disk by
+        # Django; wrapping the file keeps the import itself streaming
+        if upload.name.lower().endswith('.gz'):
+            stream = gzip.open(upload.file, 'rt', encoding='utf-8-sig', newline='')
+        else:
+            stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        try:
+            context['result'] = CatalogImporter(batch_size).run(stream, file_format)
+        except (UnicodeDecodeError, OSError, EOFError):
+            messages.error(request, 'The file could not be read; check its encoding and compression')
+        context['filename'] = upload.name
+    return render(request, 'shop_admin/import_products.html', context)
+
 @staff_member_required
 def add_product(request):
     """Add new product"""
     if request.method == 'POST':
         name = request.POST.get('name')
         description = request.POST.get('description')
-        price = float(request.POST.get('price'))
-        stock = int(request.POST.get('stock'))
+        price, stock = _price_and_stock(request.POST)
         category = request.POST.get('category')
         image = request.FILES.get('image')
+        if price is None:
+            messages.error(request, 'Enter a valid price and stock')
+            return render(request, 'shop_admin/add_product.html')
         
-        ProductService.create_product(
-            name=name,
-            description=description,
-            price=price,
-            stock=stock,
-            category=category,
-            image=image
-        )
+        try:
+            ProductService.create_product(
+                name=name,
+                description=description,
+                price=price,
+                stock=stock,
+                category=category,
+                image=image
+            )
+        except ValidationError as error:
+            messages.error(request, ' '.join(error.messages))
+            return render(request, 'shop_admin/add_product.html')
         messages.success(request, 'Product added successfully')
         return redirect('manage_products')
     
@@ -68,10 +247,12 @@ def edit_product(request, product_id):
     if request.method == 'POST':
         name = request.POST.get('name')
         description = request.POST.get('description')
-        price = float(request.POST.get('price'))
-        stock = int(request.POST.get('stock'))
+        price, stock = _price_and_stock(request.POST)
         category = request.POST.get('category')
         image = request.FILES.get('image')
+        if price is None:
+            messages.error(request, 'Enter a valid price and stock')
+            return render(request, 'shop_admin/edit_product.html', {'product': product})
         
         update_data = {
             'name': name,
@@ -84,7 +265,11 @@ def edit_product(request, product_id):
         if image:
             update_data['image'] = image
         
-        ProductService.update_product(product_id, **update_data)
+        try:
+            ProductService.update_product(product_id, **update_data)
+        except ValidationError as error:
+            messages.error(request, ' '.join(error.messages))
+            return render(request, 'shop_admin/edit_product.html', {'product': product})
         messages.success(request, 'Product updated successfully')
         return redirect('manage_products')
     
@@ -103,10 +288,29 @@ def delete_product(request, product_id):
 @staff_member_required
 def manage_orders(request):
     """Manage orders"""
-    orders = Order.objects.all().select_related('user')
-    context = {'orders': orders}
+    filters = _order_filters(request.GET)
+    filters['sort'] = request.GET.get('sort', 'newest')
+    page, estimate = AdminListService.get_orders_page(
+        **filters, cursor=request.GET.get('cursor'), per_page=settings.ADMIN_ROWS_PER_PAGE
+    )
+    context = {
+        'orders': page.object_list,
+        'page': page,
+        'estimate': estimate,
+        'filters': filters,
+        'status_choices': Order.STATUS_CHOICES,
+    }
     return render(request, 'shop_admin/manage_orders.html', context)
 
+@staff_member_required
+def export_orders(request):
+    """Stream order lines matching the manage_orders filters as CSV or JSON Lines"""
+    file_format = request.GET.get('format', 'csv')
+    if file_format not in ExportService.FORMATS:
+        file_format = 'csv'
+    orders = AdminListService.filter_orders(**_order_filters(request.GET))
+    return _export_response(ExportService.order_rows(orders), ORDER_COLUMNS, file_format, 'orders')
+
 @staff_member_required
 def update_order_status_view(request, order_id):
     """Update order status"""
@@ -121,9 +325,42 @@ def update_order_status_view(request, order_id):
     
     return redirect('manage_orders')
 
+@staff_member_required
+@require_POST
+def bulk_update_order_status(request):
+    """Change the status of the selected orders, or of every order matching the filters"""
+    order_ids = None
+    if request.POST.get('apply_to') == 'filter':
+        orders = AdminListService.filter_orders(**_order_filters(request.POST))
+    else:
+        try:
+            order_ids = [int(order_id) for order_id in request.POST.getlist('order_ids')]
+        except ValueError:
+            return JsonResponse({'error': 'Invalid order id'}, status=400)
+        if not order_ids:
+            return JsonResponse({'error': 'No orders selected'}, status=400)
+        orders = Order.objects.filter(id__in=order_ids)
+
+    results, message = OrderService.bulk_update_status(orders, request.POST.get('to_status'), order_ids)
+    if results is None:
+        return JsonResponse({'error': message}, status=400)
+    return JsonResponse({'message': message, 'results': results})
+
 @staff_member_required
 def manage_users(request):
     """Manage users"""
-    users = User.objects.all()
-    context = {'users': users}
+    filters = {
+        'staff': _flag(request.GET.get('staff')),
+        'active': _flag(request.GET.get('active')),
+        'sort': request.GET.get('sort', 'newest'),
+    }
+    page, estimate = AdminListService.get_users_page(
+        **filters, cursor=request.GET.get('cursor'), per_page=settings.ADMIN_ROWS_PER_PAGE
+    )
+    context = {
+        'users': page.object_list,
+        'page': page,
+        'estimate': estimate,
+        'filters': filters,
+    }
     return render(request, 'shop_admin/manage_users.html', context)
@@ -11,17 +11,195 @@ document.addEventListener('DOMContentLoaded', function() {
     });
 
     // Status change confirmation
-    const statusSelects = document.querySelectorAll('select[name="status"]');
+    const statusSelects = document.querySelectorAll('.admin-table select[name="status"]');
     statusSelects.forEach(function(select) {
         const originalValue = select.value;
         
         select.addEventListener('change', function() {
             if (!confirm('Are you sure you want to change the order status?')) {
                 this.value = originalValue;
+                return;
             }
+            this.form.submit();
         });
     });
 
+    // Bulk price/stock editing in the product grid
+    const gridForm = document.getElementById('product-grid-form');
+    if (gridForm) {
+        const cells = document.querySelectorAll('.product-grid .grid-cell');
+        const changedCount = document.getElementById('grid-changed-count');
+        const gridResult = document.getElementById('product-grid-result');
+
+        function changedCells() {
+            return Array.from(cells).filter(function(cell) {
+                return cell.value !== cell.defaultValue;
+            });
+        }
+
+        cells.forEach(function(cell) {
+            cell.addEventListener('input', function() {
+                cell.classList.toggle('changed', cell.value !== cell.defaultValue);
+                changedCount.textContent = changedCells().length;
+            });
+        });
+
+        gridForm.addEventListener('submit', function(e) {
+            e.preventDefault();
+            const rows = {};
+            changedCells().forEach(function(cell) {
+                const tr = cell.closest('tr');
+                const id = tr.dataset.productId;
+                rows[id] = rows[id] || {id: id, updated_at: tr.dataset.updatedAt};
+                rows[id][cell.name] = cell.value;
+            });
+            if (!Object.keys(rows).length) {
+                gridResult.textContent = 'Nothing to save';
+                return;
+            }
+
+            fetch(gridForm.action, {
+                method: 'POST',
+                body: JSON.stringify({rows: Object.values(rows)}),
+                headers: {
+                    'Content-Type': 'application/json',
+                    'X-CSRFToken': gridForm.querySelector('[name="csrfmiddlewaretoken"]').value
+                }
+            })
+                .then(function(response) {
+                    return response.json();
+                })
+                .then(function(body) {
+                    if (body.error) {
+                        gridResult.textContent = body.error;
+                        return;
+                    }
+                    gridResult.textContent = body.message;
+                    document.querySelectorAll('.product-grid tr[data-product-id]').forEach(function(tr) {
+                        const id = tr.dataset.productId;
+                        const rowCells = tr.querySelectorAll('.grid-cell');
+                        if (body.updated[id]) {
+                            // Saved: the new version becomes the baseline for the next edit
+                            tr.dataset.updatedAt = body.updated[id];
+                            rowCells.forEach(function(cell) {
+                                cell.defaultValue = cell.value;
+                                cell.classList.remove('changed', 'conflict');
+                            });
+                        } else if (body.conflicts.indexOf(Number(id)) !== -1 || body.errors[id]) {
+                            rowCells.forEach(function(cell) {
+                                if (cell.value !== cell.defaultValue) {
+                                    cell.classList.add('conflict');
+                                    cell.title = body.errors[id] || 'Changed by someone else since this page loaded';
+                                }
+                            });
+                        }
+                    });
+                    changedCount.textContent = changedCells().length;
+                })
+                .catch(function() {
+                    gridResult.textContent = 'Saving failed, please retry';
+                });
+        });
+    }
+
+    // Multi-select and bulk status change
+    const bulkForm = document.getElementById('bulk-status-form');
+    if (bulkForm) {
+        const orderBoxes = document.querySelectorAll('.order-select');
+        const selectAll = document.getElementById('select-all-orders');
+        const selectedCount = document.getElementById('bulk-selected-count');
+        const resultLine = document.getElementById('bulk-status-result');
+        let lastChecked = null;
+
+        function selectedIds() {
+            return Array.from(orderBoxes).filter(function(box) {
+                return box.checked;
+            }).map(function(box) {
+                return box.value;
+            });
+        }
+
+        function refreshCount() {
+            selectedCount.textContent = selectedIds().length;
+        }
+
+        selectAll.addEventListener('change', function() {
+            orderBoxes.forEach(function(box) {
+                box.checked = selectAll.checked;
+            });
+            refreshCount();
+        });
+
+        // Shift-click selects every row between the last two clicks
+        orderBoxes.forEach(function(box, index) {
+            box.addEventListener('click', function(e) {
+                if (e.shiftKey && lastChecked !== null) {
+                    const start = Math.min(lastChecked, index);
+                    const end = Math.max(lastChecked, index);
+                    for (let i = start; i <= end; i++) {
+                        orderBoxes[i].checked = box.checked;
+                    }
+                }
+                lastChecked = index;
+                refreshCount();
+            });
+        });
+
+        bulkForm.addEventListener('submit', function(e) {
+            e.preventDefault();
+            const applyTo = e.submitter ? e.submitter.value : 'selected';
+            const data = new FormData(bulkForm);
+            data.set('apply_to', applyTo);
+
+            if (applyTo === 'selected') {
+                const ids = selectedIds();
+                if (!ids.length) {
+                    alert('Select at least one order');
+                    return;
+                }
+                ids.forEach(function(id) {
+                    data.append('order_ids', id);
+                });
+            }
+
+            const target = applyTo === 'selected' ? 'the selected orders' : 'every order matching the filters';
+            if (!confirm('Change the status of ' + target + ' to "' + data.get('to_status') + '"?')) {
+                return;
+            }
+
+            fetch(bulkForm.action, {
+                method: 'POST',
+                body: data,
+                headers: {'X-Requested-With': 'XMLHttpRequest'}
+            })
+                .then(function(response) {
+                    return response.json();
+                })
+                .then(function(body) {
+                    if (body.error) {
+                        resultLine.textContent = body.error;
+                        return;
+                    }
+                    const failed = body.results.filter(function(result) {
+                        return result.result === 'rejected' || result.result === 'not_found';
+                    });
+                    resultLine.textContent = body.message + failed.slice(0, 10).map(function(result) {
+                        return ' #' + result.id + ': ' + result.error + '.';
+                    }).join('');
+                    body.results.forEach(function(result) {
+                        const box = document.querySelector('.order-select[value="' + result.id + '"]');
+                        const select = box && box.closest('tr').querySelector('select[name="status"]');
+                        if (select && result.status) {
+                            select.value = result.status;
+                        }
+                    });
+                })
+                .catch(function() {
+                    resultLine.textContent = 'Bulk update failed, please retry';
+                });
+        });
+    }
+
     // Image preview on file select
     const imageInputs = document.querySelectorAll('input[type="file"]');
     imageInputs.forEach(function(input) {
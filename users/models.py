@@ -39,7 +39,8 @@ class Order(models.Model):
         ('cancelled', 'Cancelled'),
     ]
 
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='orders')
+    # Indexed through order_user_created_idx, which starts with user
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='orders', db_index=False)
     total_amount = models.DecimalField(max_digits=10, decimal_places=2)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     shipping_address = models.TextField()
@@ -51,6 +52,19 @@ class Order(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Incremental sales rollups scan orders changed since a watermark
+            models.Index(fields=['updated_at'], name='order_updated_idx'),
+            # shop_admin order table, newest first with an optional status filter
+            models.Index(fields=['created_at', 'id'], name='order_created_idx'),
+            models.Index(fields=['status', 'created_at', 'id'], name='order_status_created_idx'),
+            # ... and sorted by total
+            models.Index(fields=['total_amount', 'id'], name='order_total_idx'),
+            # A shopper's orders newest first, all of them or by status
+            # (ongoing orders / order history)
+            models.Index(fields=['user', 'created_at'], name='order_user_created_idx'),
+            models.Index(fields=['user', 'status', 'created_at'], name='order_user_status_created_idx'),
+        ]
 
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
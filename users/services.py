@@ -1,6 +1,10 @@
+from django.conf import settings
 from django.db import transaction
+from django.db.models import Q, Sum
+from django.utils import timezone
 from .models import Cart, Order, OrderItem, UserProfile
-from products.services import ProductService
+from products.services import ProductService, ReservationService
+from shop_admin.services import StatsService
 
 class CartService:
     @staticmethod
@@ -9,53 +13,55 @@ class CartService:
         return Cart.objects.filter(user=user).select_related('product')
 
     @staticmethod
+    @transaction.atomic
     def add_to_cart(user, product_id, quantity=1):
-        """Add product to cart or update quantity"""
+        """Add product to cart or update quantity, reserving the stock for the cart"""
         product = ProductService.get_product_by_id(product_id)
         if not product:
             return None, "Product not found"
 
-        if not ProductService.check_stock(product_id, quantity):
-            return None, "Insufficient stock"
+        cart_item = Cart.objects.filter(user=user, product=product).first()
+        total_quantity = quantity + (cart_item.quantity if cart_item else 0)
 
-        cart_item, created = Cart.objects.get_or_create(
-            user=user,
-            product=product,
-            defaults={'quantity': quantity}
-        )
+        if not ReservationService.reserve(user, product_id, total_quantity):
+            return None, "Insufficient stock"
 
-        if not created:
-            cart_item.quantity += quantity
-            if not ProductService.check_stock(product_id, cart_item.quantity):
-                return None, "Insufficient stock"
-            cart_item.save()
+        if cart_item:
+            cart_item.quantity = total_quantity
+            cart_item.save(update_fields=['quantity'])
+        else:
+            cart_item = Cart.objects.create(user=user, product=product, quantity=quantity)
 
         return cart_item, "Added to cart"
 
     @staticmethod
+    @transaction.atomic
     def update_cart_item(user, product_id, quantity):
         """Update cart item quantity"""
         try:
             cart_item = Cart.objects.get(user=user, product_id=product_id)
             if quantity <= 0:
                 cart_item.delete()
+                ReservationService.release(user, product_id)
                 return True, "Item removed from cart"
             
-            if not ProductService.check_stock(product_id, quantity):
+            if not ReservationService.reserve(user, product_id, quantity):
                 return False, "Insufficient stock"
             
             cart_item.quantity = quantity
-            cart_item.save()
+            cart_item.save(update_fields=['quantity'])
             return True, "Cart updated"
         except Cart.DoesNotExist:
             return False, "Item not found in cart"
 
     @staticmethod
+    @transaction.atomic
     def remove_from_cart(user, product_id):
         """Remove item from cart"""
         try:
             cart_item = Cart.objects.get(user=user, product_id=product_id)
             cart_item.delete()
+            ReservationService.release(user, product_id)
             return True, "Item removed from cart"
         except Cart.DoesNotExist:
             return False, "Item not found in cart"
@@ -74,15 +80,34 @@ class CartService:
 
 
 class OrderService:
+    CANCELLABLE_STATUSES = ['pending', 'processing', 'shipped']
+
     @staticmethod
     @transaction.atomic
     def create_order_from_cart(user, shipping_address):
-        """Create order from user's cart"""
-        cart_items = Cart.objects.filter(user=user).select_related('product')
-        
-        if not cart_items.exists():
+        """Create order from user's cart.
+
+        Runs a fixed number of queries whatever the cart size: one each to
+        load the cart and its reservations, one for the order, one stock
+        UPDATE, one to drop the converted reservations, one for the dashboard
+        counters, one bulk insert of the order items and one delete to clear
+        the cart.
+        """
+        cart_items = list(Cart.objects.filter(user=user).select_related('product'))
+
+        if not cart_items:
             return None, "Cart is empty"
 
+        # Units this user already holds; those are converted, not re-checked
+        # against other carts' reservations
+        held = ReservationService.get_held_quantities(user, [item.product_id for item in cart_items])
+
+        # Validate stock for every item before writing anything
+        for cart_item in cart_items:
+            product = cart_item.product
+            if product.stock - product.reserved + held.get(product.id, 0) < cart_item.quantity:
+                return None, f"Insufficient stock for {product.name}"
+
         # Calculate total
         total_amount = sum(item.get_total_price() for item in cart_items)
 
@@ -93,20 +118,30 @@ class OrderService:
             shipping_address=shipping_address
         )
 
-        # Create order items and reduce stock
-        for cart_item in cart_items:
-            if not ProductService.check_stock(cart_item.product.id, cart_item.quantity):
-                transaction.set_rollback(True)
-                return None, f"Insufficient stock for {cart_item.product.name}"
+        # Convert reservations into stock decrements with conditional updates;
+        # fails instead of overselling if the stock went elsewhere meanwhile
+        reduced, failed_product_id = ReservationService.convert(
+            user,
+            {item.product_id: item.quantity for item in cart_items},
+            held
+        )
+        if not reduced:
+            transaction.set_rollback(True)
+            failed = next(item for item in cart_items if item.product_id == failed_product_id)
+            return None, f"Insufficient stock for {failed.product.name}"
 
-            OrderItem.objects.create(
+        StatsService.increment(orders=1, orders_pending=1, revenue=total_amount)
+
+        # Create order items
+        OrderItem.objects.bulk_create([
+            OrderItem(
                 order=order,
                 product=cart_item.product,
                 quantity=cart_item.quantity,
                 price=cart_item.product.price
             )
-
-            ProductService.reduce_stock(cart_item.product.id, cart_item.quantity)
+            for cart_item in cart_items
+        ])
 
         # Clear cart
         CartService.clear_cart(user)
@@ -147,35 +182,170 @@ class OrderService:
     @staticmethod
     @transaction.atomic
     def cancel_order(order_id, user):
-        """Cancel an order and restore stock"""
-        order = OrderService.get_order_by_id(order_id, user)
-        
+        """Cancel an order and restore stock.
+
+        The status flip is an UPDATE conditional on the status we read, so of
+        two concurrent cancellations only one changes the row and restores
+        stock.
+        """
+        order = Order.objects.filter(id=order_id, user=user).values('status', 'total_amount').first()
         if not order:
             return False, "Order not found"
 
-        if order.status in ['delivered', 'cancelled']:
-            return False, f"Cannot cancel {order.status} order"
+        if order['status'] not in OrderService.CANCELLABLE_STATUSES:
+            return False, f"Cannot cancel {order['status']} order"
 
-        # Restore stock
-        for item in order.items.all():
-            product = item.product
-            product.stock += item.quantity
-            product.save()
+        cancelled = Order.objects.filter(
+            id=order_id,
+            status=order['status']
+        ).update(status='cancelled', updated_at=timezone.now())
 
-        order.status = 'cancelled'
-        order.save()
+        if not cancelled:
+            return False, "Order was updated meanwhile, please try again"
+
+        OrderService._restore_order_stock([order_id])
+        StatsService.order_status_changed(order['status'], 'cancelled', order['total_amount'])
 
         return True, "Order cancelled successfully"
 
+    @staticmethod
+    @transaction.atomic
+    def cancel_orders(order_ids):
+        """Cancel many orders at once and restore their stock (admin function).
+
+        Orders that are already delivered or cancelled are skipped. Returns
+        (cancelled_ids, message); nothing is changed if another request
+        modifies one of the orders while this runs.
+        """
+        cancellable = list(
+            Order.objects.select_for_update().filter(
+                id__in=order_ids,
+                status__in=OrderService.CANCELLABLE_STATUSES
+            ).values_list('id', 'status', 'total_amount')
+        )
+        if not cancellable:
+            return [], "No cancellable orders selected"
+
+        cancelled_ids = [order_id for order_id, _, _ in cancellable]
+        cancelled = Order.objects.filter(
+            id__in=cancelled_ids,
+            status__in=OrderService.CANCELLABLE_STATUSES
+        ).update(status='cancelled', updated_at=timezone.now())
+
+        if cancelled != len(cancellable):
+            transaction.set_rollback(True)
+            return [], "Orders changed while cancelling, please retry"
+
+        OrderService._restore_order_stock(cancelled_ids)
+
+        deltas = {'orders_cancelled': cancelled, 'revenue': -sum(total for _, _, total in cancellable)}
+        for _, status, _ in cancellable:
+            deltas[f'orders_{status}'] = deltas.get(f'orders_{status}', 0) - 1
+        StatsService.increment(**deltas)
+
+        return cancelled_ids, f"{cancelled} order(s) cancelled"
+
+    @staticmethod
+    def _restore_order_stock(order_ids):
+        """Return the items of the given orders to stock, one UPDATE per product chunk"""
+        quantities = dict(
+            OrderItem.objects.filter(order_id__in=order_ids)
+            .values('product_id')
+            .annotate(total=Sum('quantity'))
+            .values_list('product_id', 'total')
+        )
+        ProductService.restore_stock_bulk(quantities)
+
+    @staticmethod
+    def can_change_status(old_status, new_status):
+        """Whether an admin may move an order from old_status to new_status"""
+        if old_status == 'cancelled':
+            return False
+        return new_status != 'cancelled' or old_status in OrderService.CANCELLABLE_STATUSES
+
+    @staticmethod
+    @transaction.atomic
+    def bulk_update_status(orders, status, order_ids=None):
+        """Move every order in the `orders` queryset to `status` (admin function).
+
+        Valid transitions are applied with a single conditional UPDATE;
+        cancellations go through cancel_orders so stock is restored. Returns
+        (results, message) with one {'id', 'result', 'status'} dict per
+        selected order, result being 'updated', 'unchanged' or 'rejected'.
+        When the caller selected orders by id, ids passed as order_ids that
+        are not in `orders` get a 'not_found' result. results is None, and
+        nothing is changed, if the request is invalid or an order is
+        modified concurrently.
+        """
+        if status not in dict(Order.STATUS_CHOICES):
+            return None, "Invalid status"
+
+        limit = settings.BULK_ORDER_STATUS_LIMIT
+        selected = list(
+            orders.select_for_update().order_by('id')
+            .values_list('id', 'status', 'total_amount')[:limit + 1]
+        )
+        if len(selected) > limit:
+            return None, f"Select at most {limit} orders at a time"
+
+        results = []
+        changes = {}
+        for order_id, old_status, _ in selected:
+            if old_status == status:
+                results.append({'id': order_id, 'result': 'unchanged', 'status': old_status})
+            elif not OrderService.can_change_status(old_status, status):
+                results.append({
+                    'id': order_id, 'result': 'rejected', 'status': old_status,
+                    'error': f"Cannot change a {old_status} order to {status}",
+                })
+            else:
+                changes.setdefault(old_status, []).append(order_id)
+                results.append({'id': order_id, 'result': 'updated', 'status': status})
+
+        found = {result['id'] for result in results}
+        for order_id in dict.fromkeys(order_ids or []):
+            if order_id not in found:
+                results.append({'id': order_id, 'result': 'not_found', 'status': None, 'error': "Order not found"})
+
+        changed_ids = [order_id for ids in changes.values() for order_id in ids]
+        if status == 'cancelled' and changed_ids:
+            cancelled_ids, _ = OrderService.cancel_orders(changed_ids)
+            if len(cancelled_ids) != len(changed_ids):
+                transaction.set_rollback(True)
+                return None, "Orders changed while updating, please retry"
+        elif changed_ids:
+            # One statement for every old status; each row must still have
+            # the status it was read with, or the stats deltas would be wrong
+            condition = Q()
+            for old_status, ids in changes.items():
+                condition |= Q(status=old_status, id__in=ids)
+            updated = Order.objects.filter(condition).update(status=status, updated_at=timezone.now())
+            if updated != len(changed_ids):
+                transaction.set_rollback(True)
+                return None, "Orders changed while updating, please retry"
+
+            deltas = {f'orders_{status}': updated}
+            for old_status, ids in changes.items():
+                deltas[f'orders_{old_status}'] = -len(ids)
+            StatsService.increment(**deltas)
+
+        rejected = sum(1 for result in results if result['result'] == 'rejected')
+        not_found = sum(1 for result in results if result['result'] == 'not_found')
+        message = f"{len(changed_ids)} order(s) updated"
+        if rejected:
+            message += f", {rejected} rejected"
+        if not_found:
+            message += f", {not_found} not found"
+        return results, message
+
     @staticmethod
     def update_order_status(order_id, status):
         """Update order status (admin function)"""
-        order = OrderService.get_order_by_id(order_id)
-        if not order:
-            return False, "Order not found"
-
-        order.status = status
-        order.save()
+        results, message = OrderService.bulk_update_status(Order.objects.filter(id=order_id), status, [order_id])
+        if results is None:
+            return False, message
+        if results[0]['result'] in ('rejected', 'not_found'):
+            return False, results[0]['error']
         return True, "Order status updated"
 
 
@@ -1,3 +1,216 @@
-from django.test import TestCase
+import unittest
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from main.testing import IsolatedCacheTestCase
+from products.models import Product, StockReservation
+from products.tests import full_scans
+from .models import Cart, Order, OrderItem
+from .services import CartService, OrderService
 
-# Create your tests here.
+
+class CreateOrderFromCartTests(IsolatedCacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('shopper', 'shopper@example.com', 'secret')
+
+    def fill_cart(self, size, stock=10, quantity=2):
+        products = Product.objects.bulk_create([
+            Product(name=f'Product {i}', description='', price=5, stock=stock, category='Test')
+            for i in range(size)
+        ])
+        for product in products:
+            CartService.add_to_cart(self.user, product.id, quantity)
+        return products
+
+    def test_query_count_for_fifty_item_cart(self):
+        products = self.fill_cart(50)
+
+        # cart load, reservations load, order insert, stock update, reservations
+        # delete, dashboard counters, order items insert and cart delete, plus
+        # the savepoint pairs of the three atomic blocks
+        with self.assertNumQueries(14):
+            order, message = OrderService.create_order_from_cart(self.user, '1 Test St')
+
+        self.assertIsNotNone(order, message)
+        self.assertEqual(order.total_amount, 50 * 2 * 5)
+        self.assertEqual(OrderItem.objects.filter(order=order).count(), 50)
+        self.assertFalse(Cart.objects.filter(user=self.user).exists())
+        self.assertFalse(StockReservation.objects.filter(user=self.user).exists())
+        self.assertEqual(
+            set(Product.objects.filter(id__in=[p.id for p in products]).values_list('stock', 'reserved')),
+            {(8, 0)}
+        )
+
+    def test_query_count_does_not_depend_on_cart_size(self):
+        self.fill_cart(1)
+        with self.assertNumQueries(14):
+            OrderService.create_order_from_cart(self.user, '1 Test St')
+
+    def test_insufficient_stock_writes_nothing(self):
+        products = self.fill_cart(3, stock=2)
+        Product.objects.filter(id=products[0].id).update(stock=1)
+
+        order, message = OrderService.create_order_from_cart(self.user, '1 Test St')
+
+        self.assertIsNone(order)
+        self.assertIn('Insufficient stock', message)
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(Cart.objects.filter(user=self.user).count(), 3)
+        self.assertEqual(Product.objects.get(id=products[1].id).stock, 2)
+
+
+class CancelOrderTests(IsolatedCacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.alice = User.objects.create_user('alice', 'alice@example.com', 'secret')
+        self.bob = User.objects.create_user('bob', 'bob@example.com', 'secret')
+        self.product = Product.objects.create(name='Widget', description='', price=5, stock=10, category='Test')
+        CartService.add_to_cart(self.alice, self.product.id, 3)
+        self.order, _ = OrderService.create_order_from_cart(self.alice, '1 Test St')
+
+    def stock(self):
+        self.product.refresh_from_db()
+        return self.product.stock
+
+    def test_cancelling_restores_stock_once(self):
+        self.assertEqual(self.stock(), 7)
+
+        self.assertEqual(OrderService.cancel_order(self.order.id, self.alice), (True, 'Order cancelled successfully'))
+        self.assertEqual(self.stock(), 10)
+
+        self.assertEqual(OrderService.cancel_order(self.order.id, self.alice), (False, 'Cannot cancel cancelled order'))
+        self.assertEqual(OrderService.cancel_orders([self.order.id]), ([], 'No cancellable orders selected'))
+        self.assertEqual(self.stock(), 10)
+
+    def test_cannot_cancel_another_users_order(self):
+        self.assertEqual(OrderService.cancel_order(self.order.id, self.bob), (False, 'Order not found'))
+
+        self.assertEqual(Order.objects.get(id=self.order.id).status, 'pending')
+        self.assertEqual(self.stock(), 7)
+
+    def test_bulk_cancel_skips_orders_that_cannot_be_cancelled(self):
+        Order.objects.filter(id=self.order.id).update(status='delivered')
+        CartService.add_to_cart(self.alice, self.product.id, 2)
+        pending, _ = OrderService.create_order_from_cart(self.alice, '1 Test St')
+
+        cancelled_ids, _ = OrderService.cancel_orders([self.order.id, pending.id])
+
+        self.assertEqual(cancelled_ids, [pending.id])
+        self.assertEqual(self.stock(), 7)
+
+
+class CartReservationTests(IsolatedCacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.product = Product.objects.create(name='Hot item', description='', price=1, stock=3, category='Test')
+        self.alice = User.objects.create_user('alice', 'alice@example.com', 'secret')
+        self.bob = User.objects.create_user('bob', 'bob@example.com', 'secret')
+
+    def test_reserved_units_are_not_available_to_other_carts(self):
+        self.assertIsNotNone(CartService.add_to_cart(self.alice, self.product.id, 2)[0])
+
+        cart_item, message = CartService.add_to_cart(self.bob, self.product.id, 2)
+
+        self.assertIsNone(cart_item)
+        self.assertEqual(message, 'Insufficient stock')
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.stock, self.product.reserved), (3, 2))
+
+    def test_expired_reservations_are_reclaimed(self):
+        CartService.add_to_cart(self.alice, self.product.id, 3)
+        StockReservation.objects.filter(user=self.alice).update(expires_at=timezone.now())
+
+        cart_item, message = CartService.add_to_cart(self.bob, self.product.id, 3)
+
+        self.assertIsNotNone(cart_item, message)
+        self.assertFalse(StockReservation.objects.filter(user=self.alice).exists())
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.reserved, 3)
+
+    def test_removing_from_cart_releases_the_reservation(self):
+        CartService.add_to_cart(self.alice, self.product.id, 2)
+        CartService.remove_from_cart(self.alice, self.product.id)
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.reserved, 0)
+
+
+class BulkUpdateStatusTests(IsolatedCacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('shopper', 'shopper@example.com', 'secret')
+        self.product = Product.objects.create(name='Widget', description='', price=5, stock=10, category='Test')
+
+    def place_order(self, status):
+        order = Order.objects.create(user=self.user, total_amount=5, status=status, shipping_address='x')
+        OrderItem.objects.create(order=order, product=self.product, quantity=1, price=5)
+        return order
+
+    def test_rejects_leaving_cancelled_and_updates_the_rest_in_one_statement(self):
+        pending, processing, cancelled = [self.place_order(s) for s in ('pending', 'processing', 'cancelled')]
+
+        order_ids = [pending.id, processing.id, cancelled.id, cancelled.id + 100]
+
+        # Savepoints, one SELECT, one UPDATE for both old statuses, one stats UPDATE
+        with self.assertNumQueries(5):
+            results, message = OrderService.bulk_update_status(
+                Order.objects.filter(id__in=order_ids), 'shipped', order_ids
+            )
+
+        by_id = {result['id']: result['result'] for result in results}
+        self.assertEqual(by_id, {pending.id: 'updated', processing.id: 'updated', cancelled.id: 'rejected',
+                                 cancelled.id + 100: 'not_found'})
+        self.assertEqual(message, '2 order(s) updated, 1 rejected, 1 not found')
+        self.assertEqual(
+            dict(Order.objects.values_list('id', 'status')),
+            {pending.id: 'shipped', processing.id: 'shipped', cancelled.id: 'cancelled'}
+        )
+
+    def test_bulk_cancel_restores_stock(self):
+        orders = [self.place_order('pending') for _ in range(3)]
+
+        results, _ = OrderService.bulk_update_status(Order.objects.filter(id__in=[o.id for o in orders]), 'cancelled')
+
+        self.assertEqual([result['result'] for result in results], ['updated'] * 3)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 13)
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'Reads SQLite EXPLAIN QUERY PLAN output')
+class QueryPlanTests(IsolatedCacheTestCase):
+    """Every query CartService and OrderService issue must be driven by an
+    index (see products.tests.full_scans)"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('shopper', 'shopper@example.com', 'secret')
+        self.products = Product.objects.bulk_create([
+            Product(name=f'Lamp {i}', description='Desk lamp', price=10, stock=50, category='Home')
+            for i in range(3)
+        ])
+
+    def test_service_queries_use_indexes(self):
+        lamp, other, third = self.products
+        with CaptureQueriesContext(connection) as captured:
+            CartService.add_to_cart(self.user, lamp.id, 2)
+            CartService.add_to_cart(self.user, other.id, 1)
+            CartService.update_cart_item(self.user, other.id, 2)
+            list(CartService.get_user_cart(self.user))
+            CartService.get_cart_total(self.user)
+
+            order, _ = OrderService.create_order_from_cart(self.user, '1 Main St')
+            list(OrderService.get_user_orders(self.user))
+            list(OrderService.get_ongoing_orders(self.user))
+            list(OrderService.get_order_history(self.user))
+            OrderService.get_order_by_id(order.id, self.user)
+            OrderService.update_order_status(order.id, 'processing')
+            OrderService.cancel_order(order.id, self.user)
+
+            CartService.add_to_cart(self.user, third.id, 1)
+            CartService.remove_from_cart(self.user, third.id)
+            CartService.clear_cart(self.user)
+
+        self.assertGreater(len(captured), 20)
+        self.assertEqual(full_scans(captured.captured_queries), [])